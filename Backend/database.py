@@ -5,22 +5,85 @@ Handles Postgres database connections and SQL query execution.
 Returns results as pandas DataFrames.
 """
 
-from typing import Optional, Any
+import os
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Callable, Iterable, Iterator, Optional, Any, Sequence, TypeVar
 import pandas as pd
 
 
+T = TypeVar("T")
+
+# Upper bound on pooled connections; small pools keep Postgres happy
+MAX_POOL_SIZE = 8
+
+# Rows fetched per round-trip when streaming SELECT results
+FETCH_CHUNK_SIZE = 50_000
+
+# Queries that may be streamed through a server-side cursor
+_SELECT_RE = re.compile(r'\s*(?:SELECT|WITH)\b', re.IGNORECASE)
+
+# Clauses that make a SELECT/WITH statement write (data-modifying CTEs,
+# SELECT ... INTO, row locks); those can't run as a server-side cursor
+_WRITE_RE = re.compile(
+    r'\b(?:INSERT|UPDATE|DELETE|MERGE|INTO)\b'
+    r'|\bFOR\s+(?:NO\s+KEY\s+)?(?:UPDATE|SHARE|KEY\s+SHARE)\b',
+    re.IGNORECASE,
+)
+
+# String literals, quoted identifiers and comments, ignored when looking
+# for the clauses above
+_QUOTED_RE = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|--[^\n]*|/\*.*?\*/", re.DOTALL)
+
+# Pooled connections idle longer than this are pinged before reuse
+POOL_PING_AFTER = 30.0
+
+# Rows sent per INSERT statement by execute_many
+BATCH_PAGE_SIZE = 1000
+
+
+def is_read_only_select(query: str) -> bool:
+    """
+    Check whether a query is a single SELECT (or WITH ... SELECT) that only
+    reads, and so can be streamed through a server-side cursor.
+    """
+    if not _SELECT_RE.match(query):
+        return False
+    body = _QUOTED_RE.sub(" ", query).rstrip().rstrip(";")
+    return ";" not in body and not _WRITE_RE.search(body)
+
+
+def status_frame(rowcount: int) -> pd.DataFrame:
+    """Build the status DataFrame returned for DDL/DML statements."""
+    if rowcount >= 0:
+        return pd.DataFrame({'status': [f'OK, {rowcount} rows affected']})
+    else:
+        return pd.DataFrame({'status': ['OK']})
+
+
 class DatabaseManager:
     """
-    Manages Postgres database connections and query execution.
+    Manages a pool of Postgres connections and query execution.
+
+    Each query borrows a connection from the pool and returns it when done,
+    so concurrent callers don't serialize on a single socket.
     """
 
     def __init__(self):
-        self._connection = None
+        self._pool = None
         self._connection_string: Optional[str] = None
+        # One slot per pooled connection; the pool raises instead of
+        # waiting when it's exhausted, so borrowers queue here first
+        self._slots: Optional[threading.BoundedSemaphore] = None
+        # id(connection) -> monotonic time it was last returned to the pool
+        self._idle_since: dict[int, float] = {}
 
     def connect(self, connection_string: str):
         """
-        Connect to a Postgres database.
+        Connect to a Postgres database by opening a connection pool.
 
         Args:
             connection_string: Postgres connection string
@@ -30,55 +93,182 @@ class DatabaseManager:
             Exception if connection fails
         """
         try:
-            import psycopg2
+            from psycopg2.pool import ThreadedConnectionPool
         except ImportError:
             raise ImportError(
                 "psycopg2 is required for database connections. "
                 "Install it with: pip install psycopg2-binary"
             )
 
-        # Close existing connection if any
+        # Close existing pool if any
         self.close()
 
+        maxconn = min(os.cpu_count() or 1, MAX_POOL_SIZE)
         try:
-            self._connection = psycopg2.connect(connection_string)
+            self._pool = ThreadedConnectionPool(
+                minconn=1,
+                maxconn=maxconn,
+                dsn=connection_string,
+            )
+            self._slots = threading.BoundedSemaphore(maxconn)
             self._connection_string = connection_string
         except Exception as e:
-            self._connection = None
+            self._pool = None
             self._connection_string = None
             raise Exception(f"Failed to connect to database: {e}")
 
     def is_connected(self) -> bool:
-        """Check if database is connected."""
-        if self._connection is None:
-            return False
+        """Check if a connection pool is open (no network round-trip)."""
+        return self._pool is not None and not self._pool.closed
+
+    def close(self):
+        """Close all pooled database connections."""
+        if self._pool:
+            try:
+                self._pool.closeall()
+            except Exception:
+                pass
+            self._pool = None
+            self._idle_since.clear()
+
+    @contextmanager
+    def _conn(self) -> Iterator[Any]:
+        """
+        Borrow a live connection from the pool for the duration of the block.
 
+        Blocks while every pooled connection is in use, so callers running
+        in parallel (e.g. independent SQL groups) wait for a free connection
+        instead of failing. Connections that were lost during the block are
+        discarded instead of being returned to the pool. Open transactions
+        on returned connections are rolled back by the pool.
+        """
+        if not self.is_connected():
+            raise Exception("Not connected to database")
+
+        pool, slots = self._pool, self._slots
+        slots.acquire()
         try:
-            # Test connection
-            with self._connection.cursor() as cursor:
+            conn = self._checkout(pool)
+            try:
+                yield conn
+            finally:
+                if conn.closed:
+                    self._idle_since.pop(id(conn), None)
+                    pool.putconn(conn, close=True)
+                else:
+                    self._idle_since[id(conn)] = time.monotonic()
+                    pool.putconn(conn)
+        finally:
+            slots.release()
+
+    def _checkout(self, pool) -> Any:
+        """
+        Take a connection from the pool, replacing any found dead.
+
+        This runs before any statement is sent, so replacing a dead
+        connection here never repeats work. Connections that have sat idle
+        for more than POOL_PING_AFTER seconds are pinged first, since the
+        server may have dropped them without the client noticing.
+
+        Raises:
+            psycopg2.OperationalError if no live connection can be opened
+        """
+        import psycopg2
+
+        for _ in range(pool.maxconn + 1):
+            conn = pool.getconn()
+            idle_since = self._idle_since.pop(id(conn), None)
+            if not conn.closed and (
+                idle_since is None
+                or time.monotonic() - idle_since < POOL_PING_AFTER
+                or self._ping(conn)
+            ):
+                return conn
+            pool.putconn(conn, close=True)
+        raise psycopg2.OperationalError("No live database connection available")
+
+    @staticmethod
+    def _ping(conn) -> bool:
+        """Check that an idle connection still reaches the server."""
+        import psycopg2
+
+        try:
+            with conn.cursor() as cursor:
                 cursor.execute("SELECT 1")
+            conn.rollback()
             return True
-        except Exception:
-            # Connection lost
-            self._connection = None
+        except psycopg2.Error:
             return False
 
-    def close(self):
-        """Close the database connection."""
-        if self._connection:
-            try:
-                self._connection.close()
-            except Exception:
-                pass
-            self._connection = None
+    def _run(self, operation: Callable[[Any], T]) -> T:
+        """
+        Run an operation on a pooled connection.
+
+        Dead connections are replaced at checkout, before anything is sent.
+        Failures once the operation has started are never retried: a
+        statement may already have been applied (or committed), and errors
+        like statement timeouts or deadlocks would simply repeat.
+        """
+        with self._conn() as conn:
+            return operation(conn)
+
+    def _fetch_frames(self, conn, query: str, chunksize: int) -> Iterator[pd.DataFrame]:
+        """
+        Stream a SELECT through a server-side (named) cursor.
+
+        The result set stays in Postgres and is pulled in chunks, so only
+        one chunk of raw rows is held in Python at a time. Always yields at
+        least one (possibly empty) DataFrame so column names are preserved.
+        """
+        with conn.cursor(name=f"nb_{uuid.uuid4().hex}") as cursor:
+            cursor.itersize = chunksize
+            cursor.execute(query)
+
+            # Named cursors only populate description after the first fetch
+            rows = cursor.fetchmany(chunksize)
+            columns = [d.name for d in cursor.description]
+            yield pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+
+            while len(rows) == chunksize:
+                rows = cursor.fetchmany(chunksize)
+                if not rows:
+                    break
+                yield pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+
+    def _execute_on(self, conn, query: str, chunksize: int) -> pd.DataFrame:
+        """
+        Execute a single query on a borrowed connection without committing.
 
-    def execute_query(self, query: str) -> pd.DataFrame:
+        Returns:
+            pandas DataFrame with query results (or status message for non-SELECT)
+        """
+        if is_read_only_select(query):
+            # Stream SELECT results server-side and stitch chunks together
+            frames = list(self._fetch_frames(conn, query, chunksize))
+            if len(frames) == 1:
+                return frames[0]
+            return pd.concat(frames, ignore_index=True)
+
+        # Everything else (DDL/DML, writing CTEs, SELECT ... INTO) runs on a
+        # regular cursor; statements with RETURNING still produce rows
+        with conn.cursor() as cursor:
+            cursor.execute(query)
+            if cursor.description is not None:
+                columns = [d.name for d in cursor.description]
+                return pd.DataFrame.from_records(cursor.fetchall(), columns=columns, coerce_float=True)
+            rowcount = cursor.rowcount
+
+        # Return a status DataFrame
+        return status_frame(rowcount)
+
+    def execute_query(self, query: str, chunksize: int = FETCH_CHUNK_SIZE) -> pd.DataFrame:
         """
         Execute a SQL query and return results as DataFrame.
         Handles both SELECT queries and DDL/DML statements.
 
         Args:
             query: SQL query string
+            chunksize: Number of rows fetched per round-trip for SELECT queries
 
         Returns:
             pandas DataFrame with query results (or status message for non-SELECT)
@@ -89,34 +279,16 @@ class DatabaseManager:
         if not self.is_connected():
             raise Exception("Not connected to database")
 
-        try:
-            # Check if this is a SELECT query
-            query_stripped = query.strip().upper()
-            is_select = query_stripped.startswith('SELECT') or query_stripped.startswith('WITH')
-
-            if is_select:
-                # Use pandas for SELECT queries
-                df = pd.read_sql_query(query, self._connection)
-                return df
-            else:
-                # For DDL/DML (CREATE, INSERT, UPDATE, DELETE, etc.)
-                with self._connection.cursor() as cursor:
-                    cursor.execute(query)
-                    rowcount = cursor.rowcount
-                self._connection.commit()
-
-                # Return a status DataFrame
-                if rowcount >= 0:
-                    return pd.DataFrame({'status': [f'OK, {rowcount} rows affected']})
-                else:
-                    return pd.DataFrame({'status': ['OK']})
+        def run(conn) -> pd.DataFrame:
+            df = self._execute_on(conn, query, chunksize)
+            conn.commit()
+            return df
 
+        try:
+            # Failed transactions are rolled back when the connection
+            # is returned to the pool
+            return self._run(run)
         except Exception as e:
-            # Try to rollback on error
-            try:
-                self._connection.rollback()
-            except Exception:
-                pass
             raise Exception(f"Query failed: {e}")
 
     def execute_statement(self, statement: str) -> int:
@@ -135,17 +307,63 @@ class DatabaseManager:
         if not self.is_connected():
             raise Exception("Not connected to database")
 
-        try:
-            with self._connection.cursor() as cursor:
+        def run(conn) -> int:
+            with conn.cursor() as cursor:
                 cursor.execute(statement)
                 rowcount = cursor.rowcount
-            self._connection.commit()
+            conn.commit()
             return rowcount
+
+        try:
+            return self._run(run)
+        except Exception as e:
+            raise Exception(f"Statement failed: {e}")
+
+    def execute_many(
+        self,
+        sql_template: str,
+        rows: Iterable[Sequence],
+        page_size: int = BATCH_PAGE_SIZE,
+    ) -> int:
+        """
+        Execute an `INSERT ... VALUES %s` template for many rows.
+
+        Rows are sent as multi-row VALUES lists, page_size rows per
+        statement, instead of one round-trip per row. All pages are
+        committed together.
+
+        Args:
+            sql_template: SQL with a single `%s` placeholder for the VALUES list
+            rows: Sequences of column values, one per row
+            page_size: Number of rows per statement
+
+        Returns:
+            Number of affected rows
+
+        Raises:
+            Exception if statement fails or not connected
+        """
+        from psycopg2.extras import execute_values
+
+        if not self.is_connected():
+            raise Exception("Not connected to database")
+
+        # Materialize so the rows can be sliced into pages
+        rows = [tuple(row) for row in rows]
+
+        def run(conn) -> int:
+            total = 0
+            with conn.cursor() as cursor:
+                for start in range(0, len(rows), page_size):
+                    page = rows[start:start + page_size]
+                    execute_values(cursor, sql_template, page, page_size=len(page))
+                    total += max(cursor.rowcount, 0)
+            conn.commit()
+            return total
+
+        try:
+            return self._run(run)
         except Exception as e:
-            try:
-                self._connection.rollback()
-            except Exception:
-                pass
             raise Exception(f"Statement failed: {e}")
 
     def get_tables(self) -> list[str]:
@@ -179,11 +397,30 @@ class DatabaseManager:
 
         Returns:
             DataFrame with column information
+
+        Raises:
+            Exception if query fails or not connected
         """
-        query = f"""
+        if not self.is_connected():
+            raise Exception("Not connected to database")
+
+        # table_name is passed as a bound parameter, never interpolated
+        query = """
             SELECT column_name, data_type, is_nullable, column_default
             FROM information_schema.columns
-            WHERE table_name = '{table_name}'
+            WHERE table_name = %s
             ORDER BY ordinal_position
         """
-        return self.execute_query(query)
+
+        def run(conn) -> pd.DataFrame:
+            with conn.cursor() as cursor:
+                cursor.execute(query, (table_name,))
+                columns = [d.name for d in cursor.description]
+                rows = cursor.fetchall()
+            conn.commit()
+            return pd.DataFrame.from_records(rows, columns=columns)
+
+        try:
+            return self._run(run)
+        except Exception as e:
+            raise Exception(f"Query failed: {e}")
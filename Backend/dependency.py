@@ -9,23 +9,101 @@ Uses Python's ast module to analyze code and extract:
 """
 
 import ast
+import bisect
+import functools
+import hashlib
+import json
+import os
+import re
+import sys
+from collections import deque
 from dataclasses import dataclass
 from typing import Optional
 
 from parser import Cell
 
 
-@dataclass
+@dataclass(slots=True)
 class CellAnalysis:
     """Result of analyzing a cell's code."""
     cell_id: str
-    reads: set[str]   # Variables this cell reads
-    writes: set[str]  # Variables this cell writes/defines
+    reads: frozenset[str]   # Variables this cell reads
+    writes: frozenset[str]  # Variables this cell writes/defines
 
 
-class VariableVisitor(ast.NodeVisitor):
+# Expression contexts, hoisted for the inline name handling
+_LOAD = ast.Load
+_STORE = ast.Store
+
+# Node types that never have children worth visiting
+_LEAF_TYPES = frozenset(
+    {ast.Constant, ast.Load, ast.Store, ast.Del, ast.Pass, ast.Break, ast.Continue}
+    | {cls for base in (ast.operator, ast.unaryop, ast.cmpop, ast.boolop) for cls in base.__subclasses__()}
+)
+
+# Built-in names that are never treated as cell dependencies
+_COMMON_BUILTINS = frozenset({
+    'print', 'len', 'range', 'str', 'int', 'float', 'list', 'dict', 'set',
+    'tuple', 'bool', 'type', 'isinstance', 'hasattr', 'getattr', 'setattr',
+    'open', 'file', 'input', 'output', 'sum', 'min', 'max', 'abs', 'round',
+    'sorted', 'reversed', 'enumerate', 'zip', 'map', 'filter', 'any', 'all',
+    'None', 'True', 'False', 'Exception', 'ValueError', 'TypeError', 'KeyError',
+    '__name__', '__file__', '__doc__',
+})
+
+
+# Variable holding row parameters for SQL cells with a `%s` VALUES placeholder
+SQL_PARAMS_VAR = "_sql_params"
+
+# SQL string literals, quoted identifiers and comments, which may contain
+# text like `%s` without it being a placeholder
+_SQL_QUOTED_RE = re.compile(
+    r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|--[^\n]*|/\*.*?\*/",
+    re.DOTALL,
+)
+
+# A bulk-insert template: VALUES followed by a lone %s placeholder
+_VALUES_PARAM_RE = re.compile(r"\bVALUES\s+%s(?![\w%])", re.IGNORECASE)
+
+
+def uses_sql_params(sql: str) -> bool:
     """
-    AST visitor that extracts variable reads and writes from Python code.
+    Check whether SQL is an `INSERT ... VALUES %s` bulk template.
+
+    Only a `%s` directly after VALUES, outside string literals, quoted
+    identifiers and comments, counts; `LIKE '%smith'` does not.
+
+    Args:
+        sql: SQL cell code
+
+    Returns:
+        True if the cell takes its rows from SQL_PARAMS_VAR
+    """
+    if "%s" not in sql:
+        return False
+    return _VALUES_PARAM_RE.search(_SQL_QUOTED_RE.sub(" ", sql)) is not None
+
+
+# Maximum number of distinct code strings whose analysis is kept
+CODE_ANALYSIS_CACHE_SIZE = 1024
+
+# Analyses loaded from disk by load_analysis_store: code digest -> (reads, writes)
+_STORED_ANALYSES: dict[str, tuple[frozenset[str], frozenset[str]]] = {}
+
+# Cache of cell analyses: cell_id -> (cache key, analysis)
+# The key captures everything analyze_cell depends on, so an entry is
+# reused until the cell's code, type, or output variable changes.
+_ANALYSIS_CACHE: dict[str, tuple[tuple, CellAnalysis]] = {}
+
+
+class VariableVisitor:
+    """
+    Extracts variable reads and writes from Python code.
+
+    Walks the AST iteratively with an explicit stack and dispatches on node
+    type through a lookup table. Nodes without a handler have all their
+    children visited. Children are pushed in reverse so they are popped in
+    source order, matching a recursive pre-order walk.
     """
 
     def __init__(self):
@@ -36,19 +114,54 @@ class VariableVisitor(ast.NodeVisitor):
         # Track variables in current scope to avoid false positives
         self._local_scope: set[str] = set()
 
-    def visit_Name(self, node: ast.Name):
-        """Handle variable references."""
-        if isinstance(node.ctx, ast.Load):
-            # Reading a variable - only count as dependency if not locally defined
-            if node.id not in self._local_scope:
-                self.reads.add(node.id)
-        elif isinstance(node.ctx, ast.Store):
-            # Writing to a variable
-            self.writes.add(node.id)
-            self._local_scope.add(node.id)
-        self.generic_visit(node)
-
-    def visit_AugAssign(self, node: ast.AugAssign):
+    def visit(self, tree: ast.AST):
+        """Visit every relevant node in the tree."""
+        handlers = self._HANDLERS
+        AST = ast.AST
+        reads_add = self.reads.add
+        writes_add = self.writes.add
+        local_scope = self._local_scope
+        Name = ast.Name
+        stack = [tree]
+
+        while stack:
+            node = stack.pop()
+            node_type = type(node)
+
+            # Names are by far the most common node, so they are handled
+            # inline rather than through the dispatch table
+            if node_type is Name:
+                ctx_type = type(node.ctx)
+                if ctx_type is _LOAD:
+                    # Reading a variable - only a dependency if not locally defined
+                    if node.id not in local_scope:
+                        reads_add(node.id)
+                elif ctx_type is _STORE:
+                    # Writing to a variable
+                    writes_add(node.id)
+                    local_scope.add(node.id)
+                continue
+
+            if node_type in _LEAF_TYPES:
+                continue
+
+            handler = handlers.get(node_type)
+            if handler is not None:
+                handler(self, node, stack)
+            else:
+                # Same children as ast.iter_child_nodes, without its
+                # generator and iter_fields overhead
+                children = []
+                for field_name in node._fields:
+                    value = getattr(node, field_name, None)
+                    if isinstance(value, AST):
+                        children.append(value)
+                    elif isinstance(value, list):
+                        children.extend([item for item in value if isinstance(item, AST)])
+                children.reverse()
+                stack.extend(children)
+
+    def _visit_aug_assign(self, node: ast.AugAssign, stack: list):
         """Handle augmented assignments like x += 1, x -= 1, etc."""
         # The target is both read and written
         if isinstance(node.target, ast.Name):
@@ -61,47 +174,33 @@ class VariableVisitor(ast.NodeVisitor):
             self.writes.add(node.target.id)
             self._local_scope.add(node.target.id)
         # Visit the value being added/subtracted/etc
-        self.visit(node.value)
+        stack.append(node.value)
 
-    def visit_FunctionDef(self, node: ast.FunctionDef):
-        """Handle function definitions - the function name is written."""
+    def _visit_function_def(self, node: ast.FunctionDef, stack: list):
+        """Handle (async) function definitions - the function name is written."""
         self.writes.add(node.name)
         self._local_scope.add(node.name)
         # Don't recurse into function body - those are local variables
         # But we do want to capture variables used in default arguments
-        for default in node.args.defaults:
-            self.visit(default)
-        for default in node.args.kw_defaults:
-            if default:
-                self.visit(default)
-
-    def visit_AsyncFunctionDef(self, node: ast.AsyncFunctionDef):
-        """Handle async function definitions."""
-        self.writes.add(node.name)
-        self._local_scope.add(node.name)
-        for default in node.args.defaults:
-            self.visit(default)
-        for default in node.args.kw_defaults:
-            if default:
-                self.visit(default)
+        defaults = node.args.defaults + [d for d in node.args.kw_defaults if d]
+        stack.extend(reversed(defaults))
 
-    def visit_ClassDef(self, node: ast.ClassDef):
+    def _visit_class_def(self, node: ast.ClassDef, stack: list):
         """Handle class definitions - the class name is written."""
         self.writes.add(node.name)
         self._local_scope.add(node.name)
         # Visit base classes as they are dependencies
-        for base in node.bases:
-            self.visit(base)
         # Don't recurse into class body
+        stack.extend(reversed(node.bases))
 
-    def visit_Import(self, node: ast.Import):
+    def _visit_import(self, node: ast.Import, stack: list):
         """Handle import statements."""
         for alias in node.names:
             name = alias.asname if alias.asname else alias.name.split('.')[0]
             self.writes.add(name)
             self._local_scope.add(name)
 
-    def visit_ImportFrom(self, node: ast.ImportFrom):
+    def _visit_import_from(self, node: ast.ImportFrom, stack: list):
         """Handle from ... import statements."""
         for alias in node.names:
             name = alias.asname if alias.asname else alias.name
@@ -109,24 +208,17 @@ class VariableVisitor(ast.NodeVisitor):
                 self.writes.add(name)
                 self._local_scope.add(name)
 
-    def visit_For(self, node: ast.For):
+    def _visit_for(self, node: ast.For, stack: list):
         """Handle for loops - loop variable is written."""
         # Visit the target to capture the loop variable
         self._visit_target(node.target)
-        # Visit the iterable (it's a read)
-        self.visit(node.iter)
-        # Visit the body
-        for stmt in node.body:
-            self.visit(stmt)
-        for stmt in node.orelse:
-            self.visit(stmt)
-
-    def visit_comprehension(self, node: ast.comprehension):
+        # Then the iterable (it's a read), the body, and the else clause
+        stack.extend(reversed([node.iter, *node.body, *node.orelse]))
+
+    def _visit_comprehension(self, node: ast.comprehension, stack: list):
         """Handle comprehension targets."""
         self._visit_target(node.target)
-        self.visit(node.iter)
-        for if_clause in node.ifs:
-            self.visit(if_clause)
+        stack.extend(reversed([node.iter, *node.ifs]))
 
     def _visit_target(self, target):
         """Helper to visit assignment targets."""
@@ -137,6 +229,18 @@ class VariableVisitor(ast.NodeVisitor):
             for elt in target.elts:
                 self._visit_target(elt)
 
+    # Node type -> handler
+    _HANDLERS = {
+        ast.AugAssign: _visit_aug_assign,
+        ast.FunctionDef: _visit_function_def,
+        ast.AsyncFunctionDef: _visit_function_def,
+        ast.ClassDef: _visit_class_def,
+        ast.Import: _visit_import,
+        ast.ImportFrom: _visit_import_from,
+        ast.For: _visit_for,
+        ast.comprehension: _visit_comprehension,
+    }
+
 
 def analyze_python_code(code: str) -> tuple[set[str], set[str]]:
     """
@@ -157,23 +261,98 @@ def analyze_python_code(code: str) -> tuple[set[str], set[str]]:
     visitor = VariableVisitor()
     visitor.visit(tree)
 
-    # Filter out built-in names from reads
-    builtins = set(dir(__builtins__)) if isinstance(__builtins__, dict) else set(dir(__builtins__))
-    common_builtins = {
-        'print', 'len', 'range', 'str', 'int', 'float', 'list', 'dict', 'set',
-        'tuple', 'bool', 'type', 'isinstance', 'hasattr', 'getattr', 'setattr',
-        'open', 'file', 'input', 'output', 'sum', 'min', 'max', 'abs', 'round',
-        'sorted', 'reversed', 'enumerate', 'zip', 'map', 'filter', 'any', 'all',
-        'None', 'True', 'False', 'Exception', 'ValueError', 'TypeError', 'KeyError',
-        '__name__', '__file__', '__doc__',
-    }
-
     # Filter out builtins and local writes, but keep required_reads
-    reads = (visitor.reads - common_builtins - visitor.writes) | visitor.required_reads
+    reads = (visitor.reads - _COMMON_BUILTINS - visitor.writes) | visitor.required_reads
 
     return reads, visitor.writes
 
 
+@functools.lru_cache(maxsize=CODE_ANALYSIS_CACHE_SIZE)
+def _analyze_code(code: str) -> tuple[frozenset[str], frozenset[str]]:
+    """
+    Content-addressed analyze_python_code, shared by every cell.
+
+    Identical code in different cells (or in a cell reloaded under a new
+    id) is only parsed once. Results are immutable so they can be shared.
+    """
+    if _STORED_ANALYSES:
+        stored = _STORED_ANALYSES.get(_code_digest(code))
+        if stored is not None:
+            return stored
+
+    reads, writes = analyze_python_code(code)
+    return frozenset(reads), frozenset(writes)
+
+
+def _code_digest(code: str) -> str:
+    """Content key for a cell's code in the on-disk analysis store."""
+    return hashlib.sha256(code.encode('utf-8')).hexdigest()
+
+
+@functools.lru_cache(maxsize=1)
+def _analyzer_version() -> str:
+    """
+    Identify the analyzer that produced stored analyses.
+
+    Covers the Python version (the AST changes between releases) and this
+    module's source, so edits to the visitor never reuse stale results.
+    """
+    with open(__file__, 'rb') as f:
+        source_digest = hashlib.sha256(f.read()).hexdigest()
+    return f"{sys.version_info[0]}.{sys.version_info[1]}:{source_digest}"
+
+
+def load_analysis_store(filepath: str) -> int:
+    """
+    Load analyses saved by save_analysis_store so unchanged code is not re-parsed.
+
+    A missing, unreadable, or outdated store is ignored.
+
+    Args:
+        filepath: Path of the JSON store
+
+    Returns:
+        Number of analyses loaded
+    """
+    try:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get("analyzer") != _analyzer_version():
+            return 0
+        analyses = {
+            digest: (frozenset(reads), frozenset(writes))
+            for digest, (reads, writes) in data["analyses"].items()
+        }
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        return 0
+
+    _STORED_ANALYSES.update(analyses)
+    return len(analyses)
+
+
+def save_analysis_store(cells: list[Cell], filepath: str) -> None:
+    """
+    Save the analyses of the given Python cells for the next load_analysis_store.
+
+    Only the current cells are written, so the store stays the size of the
+    notebook. The file is replaced atomically.
+
+    Args:
+        cells: Cells whose analyses to save
+        filepath: Path of the JSON store
+    """
+    analyses = {}
+    for cell in cells:
+        if cell.cell_type != "sql":
+            reads, writes = _analyze_code(cell.code)
+            analyses[_code_digest(cell.code)] = [sorted(reads), sorted(writes)]
+
+    tmp_path = f"{filepath}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({"analyzer": _analyzer_version(), "analyses": analyses}, f)
+    os.replace(tmp_path, filepath)
+
+
 def analyze_cell(cell: Cell) -> CellAnalysis:
     """
     Analyze a cell to determine its dependencies and outputs.
@@ -181,24 +360,55 @@ def analyze_cell(cell: Cell) -> CellAnalysis:
     For SQL cells, the 'as' variable is the output.
     For Python cells, we parse the code with AST.
 
+    Results are cached per cell and only recomputed when the cell changes.
+    The returned analysis is shared, so callers must not mutate it.
+
     Args:
         cell: The Cell object to analyze
 
     Returns:
         CellAnalysis with reads and writes
     """
+    key = (cell.code, cell.cell_type, cell.as_var)
+    cached = _ANALYSIS_CACHE.get(cell.id)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    analysis = _analyze_cell_uncached(cell)
+    _ANALYSIS_CACHE[cell.id] = (key, analysis)
+    return analysis
+
+
+def invalidate_analysis(cell_id: Optional[str] = None):
+    """
+    Drop cached analysis for a cell (e.g. after deletion).
+
+    Args:
+        cell_id: The cell to invalidate, or None to clear the whole cache
+    """
+    if cell_id is None:
+        _ANALYSIS_CACHE.clear()
+        _STORED_ANALYSES.clear()
+        _analyze_code.cache_clear()
+    else:
+        _ANALYSIS_CACHE.pop(cell_id, None)
+
+
+def _analyze_cell_uncached(cell: Cell) -> CellAnalysis:
+    """Analyze a cell without consulting the cache."""
     if cell.cell_type == "sql":
-        # SQL cells don't read Python variables (for now)
+        # SQL cells only read Python variables for bulk parameters
         # They write to their 'as' variable
-        writes = {cell.as_var} if cell.as_var else {f"_sql_{cell.id}"}
+        reads = frozenset({SQL_PARAMS_VAR}) if uses_sql_params(cell.code) else frozenset()
+        writes = frozenset({cell.as_var} if cell.as_var else {f"_sql_{cell.id}"})
         return CellAnalysis(
             cell_id=cell.id,
-            reads=set(),
+            reads=reads,
             writes=writes,
         )
     else:
         # Python cell - use AST analysis
-        reads, writes = analyze_python_code(cell.code)
+        reads, writes = _analyze_code(cell.code)
         return CellAnalysis(
             cell_id=cell.id,
             reads=reads,
@@ -206,21 +416,182 @@ def analyze_cell(cell: Cell) -> CellAnalysis:
         )
 
 
-def build_dependency_graph(cells: list[Cell]) -> dict[str, set[str]]:
+class DependencyIndex:
+    """
+    Incrementally maintained map of variable -> cell that writes it, and the
+    dependency graphs derived from it.
+
+    For every variable the writing cells are kept in notebook order, so the
+    later writer wins as in a full rebuild. When the cell order is unchanged,
+    only cells whose writes changed are touched, and only the graph entries
+    of cells whose reads changed or that read a variable whose writer
+    changed are recomputed. Any reordering, insertion, or deletion triggers
+    a full rebuild.
+
+    Graph entries are replaced rather than mutated, so shallow copies of
+    graph and reverse_graph taken after an update stay valid.
     """
-    Build a dependency graph from a list of cells.
 
-    The graph maps cell_id -> set of upstream cell_ids that it depends on.
+    def __init__(self):
+        self._order: tuple[str, ...] = ()
+        self._position: dict[str, int] = {}
+        self._cell_writes: dict[str, frozenset[str]] = {}
+        self._cell_reads: dict[str, frozenset[str]] = {}
+        self._writers: dict[str, list[str]] = {}
+        self._readers: dict[str, set[str]] = {}
+        self.var_to_cell: dict[str, str] = {}
+        self.graph: dict[str, set[str]] = {}
+        self.reverse_graph: dict[str, list[str]] = {}
+
+    def update(self, cells: list[Cell], analyses: dict[str, CellAnalysis]) -> dict[str, str]:
+        """
+        Bring the index up to date with the given cells.
+
+        Args:
+            cells: All cells in notebook order
+            analyses: Analysis for every cell, keyed by cell_id
+
+        Returns:
+            The variable -> writer cell_id map
+        """
+        order = tuple(cell.id for cell in cells)
+        if order != self._order:
+            self._rebuild(order, analyses)
+            return self.var_to_cell
+
+        changed_vars: set[str] = set()
+        stale: set[str] = set()
+        for cid in order:
+            analysis = analyses[cid]
+            writes = analysis.writes
+            old_writes = self._cell_writes[cid]
+            # Cached analyses are shared, so unchanged cells hit this fast path
+            if writes is not old_writes and writes != old_writes:
+                changed_vars |= self._replace_writes(cid, old_writes, writes)
+            self._cell_writes[cid] = writes
+
+            reads = analysis.reads
+            old_reads = self._cell_reads[cid]
+            if reads is not old_reads and reads != old_reads:
+                self._replace_reads(cid, old_reads, reads)
+                stale.add(cid)
+            self._cell_reads[cid] = reads
+
+        # Cells reading a variable whose writer changed need new edges too
+        for var in changed_vars:
+            stale |= self._readers.get(var, set())
+        for cid in stale:
+            self._relink(cid)
+
+        return self.var_to_cell
+
+    def _rebuild(self, order: tuple[str, ...], analyses: dict[str, CellAnalysis]):
+        """Recompute everything from scratch."""
+        self._order = order
+        self._position = {cid: i for i, cid in enumerate(order)}
+        self._cell_writes = {}
+        self._cell_reads = {}
+        self._writers = {}
+        self._readers = {}
+        self.var_to_cell = {}
+
+        for cid in order:
+            analysis = analyses[cid]
+            self._cell_writes[cid] = analysis.writes
+            self._cell_reads[cid] = analysis.reads
+            for var in analysis.writes:
+                self._writers.setdefault(var, []).append(cid)
+                self.var_to_cell[var] = cid
+            for var in analysis.reads:
+                self._readers.setdefault(var, set()).add(cid)
+
+        self.graph, self.reverse_graph = _link_graphs(order, self._cell_reads, self.var_to_cell)
+
+    def _replace_writes(self, cid: str, old_writes: frozenset[str], new_writes: frozenset[str]) -> set[str]:
+        """
+        Swap one cell's writes, updating only the affected variables.
+
+        Returns:
+            The variables whose writer may have changed
+        """
+        removed = old_writes - new_writes
+        added = new_writes - old_writes
+
+        for var in removed:
+            writers = self._writers[var]
+            writers.remove(cid)
+            if writers:
+                self.var_to_cell[var] = writers[-1]
+            else:
+                del self._writers[var]
+                del self.var_to_cell[var]
+
+        for var in added:
+            writers = self._writers.setdefault(var, [])
+            bisect.insort(writers, cid, key=self._position.__getitem__)
+            self.var_to_cell[var] = writers[-1]
+
+        return removed | added
+
+    def _replace_reads(self, cid: str, old_reads: frozenset[str], new_reads: frozenset[str]):
+        """Swap one cell's reads in the variable -> readers map."""
+        for var in old_reads - new_reads:
+            readers = self._readers[var]
+            readers.discard(cid)
+            if not readers:
+                del self._readers[var]
+
+        for var in new_reads - old_reads:
+            self._readers.setdefault(var, set()).add(cid)
+
+    def _relink(self, cid: str):
+        """Recompute one cell's upstream edges and patch the reverse graph."""
+        dependencies = set()
+        for var in self._cell_reads[cid]:
+            upstream_cell = self.var_to_cell.get(var)
+            if upstream_cell is not None and upstream_cell != cid:
+                dependencies.add(upstream_cell)
+
+        old_dependencies = self.graph[cid]
+        if dependencies == old_dependencies:
+            return
+        self.graph[cid] = dependencies
+
+        for dep in old_dependencies - dependencies:
+            self.reverse_graph[dep] = [d for d in self.reverse_graph[dep] if d != cid]
+        for dep in dependencies - old_dependencies:
+            # Dependents stay in notebook order, as in a full build
+            dependents = list(self.reverse_graph[dep])
+            bisect.insort(dependents, cid, key=self._position.__getitem__)
+            self.reverse_graph[dep] = dependents
+
+
+def build_dependency_graphs(
+    cells: list[Cell],
+    index: Optional[DependencyIndex] = None,
+) -> tuple[dict[str, set[str]], dict[str, list[str]]]:
+    """
+    Build the forward and reverse dependency graphs in a single pass.
 
     Args:
         cells: List of Cell objects
+        index: Optional persistent index used to update the variable ->
+            writer map incrementally instead of rebuilding it
 
     Returns:
-        Dictionary mapping cell_id to set of cell_ids it depends on
+        Tuple of (graph, reverse_graph) where:
+        - graph: cell_id -> set of upstream cell_ids it depends on
+        - reverse_graph: cell_id -> list of cell_ids that directly depend on it
     """
     # First, analyze all cells
     analyses = {cell.id: analyze_cell(cell) for cell in cells}
 
+    # The index patches only the entries an edit affects; hand out copies
+    # so callers never see it change underneath them
+    if index is not None:
+        index.update(cells, analyses)
+        return dict(index.graph), dict(index.reverse_graph)
+
     # Build a map of variable -> cell_id that writes it
     # If multiple cells write the same variable, the later one wins
     var_to_cell: dict[str, str] = {}
@@ -229,175 +600,366 @@ def build_dependency_graph(cells: list[Cell]) -> dict[str, set[str]]:
         for var in analysis.writes:
             var_to_cell[var] = cell.id
 
-    # Now build the dependency graph
+    order = tuple(cell.id for cell in cells)
+    reads = {cid: analysis.reads for cid, analysis in analyses.items()}
+    return _link_graphs(order, reads, var_to_cell)
+
+
+def _link_graphs(
+    order: tuple[str, ...],
+    reads: dict[str, frozenset[str]],
+    var_to_cell: dict[str, str],
+) -> tuple[dict[str, set[str]], dict[str, list[str]]]:
+    """Build the dependency graph and its inverse from each cell's reads."""
     graph: dict[str, set[str]] = {}
+    reverse_graph: dict[str, list[str]] = {cid: [] for cid in order}
 
-    for cell in cells:
-        analysis = analyses[cell.id]
+    for cid in order:
         dependencies = set()
 
-        for var in analysis.reads:
+        for var in reads[cid]:
             if var in var_to_cell:
                 upstream_cell = var_to_cell[var]
-                if upstream_cell != cell.id:  # Don't depend on self
+                if upstream_cell != cid:  # Don't depend on self
                     dependencies.add(upstream_cell)
 
-        graph[cell.id] = dependencies
+        graph[cid] = dependencies
+        for dep in dependencies:
+            reverse_graph[dep].append(cid)
+
+    return graph, reverse_graph
+
+
+def build_dependency_graph(
+    cells: list[Cell],
+    index: Optional[DependencyIndex] = None,
+) -> dict[str, set[str]]:
+    """
+    Build a dependency graph from a list of cells.
+
+    The graph maps cell_id -> set of upstream cell_ids that it depends on.
 
+    Args:
+        cells: List of Cell objects
+        index: Optional persistent index (see build_dependency_graphs)
+
+    Returns:
+        Dictionary mapping cell_id to set of cell_ids it depends on
+    """
+    graph, _ = build_dependency_graphs(cells, index)
     return graph
 
 
-def get_downstream_cells(graph: dict[str, set[str]], cell_id: str) -> set[str]:
+def build_reverse_graph(graph: dict[str, set[str]]) -> dict[str, list[str]]:
+    """
+    Invert a dependency graph.
+
+    Args:
+        graph: Dependency graph (cell_id -> upstream dependencies)
+
+    Returns:
+        Dictionary mapping cell_id to cell_ids that directly depend on it
+    """
+    reverse_graph: dict[str, list[str]] = {cid: [] for cid in graph}
+    for cid, deps in graph.items():
+        for dep in deps:
+            if dep in reverse_graph:
+                reverse_graph[dep].append(cid)
+    return reverse_graph
+
+
+def get_downstream_cells(
+    graph: dict[str, set[str]],
+    cell_id: str,
+    reverse_graph: Optional[dict[str, list[str]]] = None,
+) -> set[str]:
     """
     Get all cells that depend on a given cell (transitively).
 
     Args:
         graph: Dependency graph (cell_id -> upstream dependencies)
         cell_id: The cell to find dependents of
+        reverse_graph: Prebuilt inverse of graph; built on the fly if omitted
 
     Returns:
         Set of cell_ids that depend on the given cell
     """
-    # Invert the graph to get downstream relationships
-    downstream: dict[str, set[str]] = {cid: set() for cid in graph}
-
-    for cid, deps in graph.items():
-        for dep in deps:
-            if dep in downstream:
-                downstream[dep].add(cid)
+    if reverse_graph is None:
+        reverse_graph = build_reverse_graph(graph)
 
-    # BFS to find all transitive dependents
+    # BFS to find all transitive dependents. Cells are marked when first
+    # queued, so each is queued once however many paths reach it.
     result = set()
-    queue = list(downstream.get(cell_id, set()))
+    queue = deque((cell_id,))
+    get_dependents = reverse_graph.get
 
     while queue:
-        current = queue.pop(0)
-        if current not in result:
-            result.add(current)
-            queue.extend(downstream.get(current, set()))
+        for dependent in get_dependents(queue.popleft(), ()):
+            if dependent not in result:
+                result.add(dependent)
+                queue.append(dependent)
 
     return result
 
 
-def topological_sort(graph: dict[str, set[str]], cell_ids: set[str]) -> list[str]:
+def find_independent_groups(cells: list[Cell], graph: dict[str, set[str]]) -> list[list[str]]:
     """
-    Topologically sort a subset of cells based on dependencies.
+    Partition cells into groups that can safely run concurrently.
+
+    Cells joined by a dependency edge land in the same group (weakly
+    connected components, via union-find). Cells that write the same
+    variable are joined too: the graph only links readers to the last
+    writer, so shadowed writers would otherwise race on the shared name.
 
     Args:
-        graph: Full dependency graph
-        cell_ids: Subset of cell_ids to sort
+        cells: All cells in notebook order
+        graph: Dependency graph (cell_id -> upstream dependencies)
 
     Returns:
-        List of cell_ids in execution order (dependencies first)
+        Groups of cell_ids, each in notebook order, ordered by first cell
+    """
+    parent = {cell.id: cell.id for cell in cells}
+
+    def find(cid: str) -> str:
+        while parent[cid] != cid:
+            parent[cid] = parent[parent[cid]]  # Path halving
+            cid = parent[cid]
+        return cid
+
+    def union(a: str, b: str):
+        root_a, root_b = find(a), find(b)
+        if root_a != root_b:
+            parent[root_b] = root_a
+
+    for cid, deps in graph.items():
+        for dep in deps:
+            if dep in parent:
+                union(cid, dep)
+
+    first_writer: dict[str, str] = {}
+    for cell in cells:
+        for var in analyze_cell(cell).writes:
+            writer = first_writer.setdefault(var, cell.id)
+            if writer != cell.id:
+                union(writer, cell.id)
+
+    groups: dict[str, list[str]] = {}
+    for cell in cells:
+        groups.setdefault(find(cell.id), []).append(cell.id)
+    return list(groups.values())
+
+
+def _kahn_order(
+    subgraph: dict[str, set[str]],
+    dependents: Optional[dict[str, list[str]]] = None,
+) -> tuple[list[str], list[str]]:
+    """
+    Run Kahn's algorithm over a graph whose dependencies are all keys.
+
+    Args:
+        subgraph: Dependency graph (cell_id -> upstream dependencies)
+        dependents: Prebuilt reverse adjacency; built from subgraph if
+            omitted. Only valid if every dependent it lists is in subgraph.
+
+    Returns:
+        Tuple of (order, remaining) where order lists cells dependencies
+        first and remaining lists cells that could not be ordered because
+        they sit on (or behind) a cycle
     """
-    # Filter graph to only include requested cells
+    in_degree = {cid: len(deps) for cid, deps in subgraph.items()}
+
+    # Reverse adjacency: dependency -> cells that depend on it
+    if dependents is None:
+        dependents = {cid: [] for cid in subgraph}
+        for cid, deps in subgraph.items():
+            for dep in deps:
+                dependents[dep].append(cid)
+
+    queue = deque([cid for cid, degree in in_degree.items() if degree == 0])
+    order = []
+    pop = queue.popleft
+    push = queue.append
+
+    while queue:
+        node = pop()
+        order.append(node)
+        for child in dependents[node]:
+            # One lookup and one store per edge
+            degree = in_degree[child] - 1
+            in_degree[child] = degree
+            if degree == 0:
+                push(child)
+
+    remaining = [cid for cid, degree in in_degree.items() if degree > 0]
+    return order, remaining
+
+
+def _restrict_graph(graph: dict[str, set[str]], cell_ids: set[str]) -> dict[str, set[str]]:
+    """Restrict a graph to cell_ids, keeping notebook order."""
     subgraph = {
         cid: deps & cell_ids
         for cid, deps in graph.items()
         if cid in cell_ids
     }
+    for cid in cell_ids:
+        if cid not in subgraph:
+            subgraph[cid] = set()
+    return subgraph
 
-    result = []
-    visited = set()
-    temp_visited = set()
-
-    def visit(node: str):
-        if node in temp_visited:
-            return  # Cycle detected, but we'll handle elsewhere
-        if node in visited:
-            return
 
-        temp_visited.add(node)
+def _extract_cycle(subgraph: dict[str, set[str]], remaining: list[str]) -> list[str]:
+    """
+    Pull one concrete cycle out of the cells Kahn's algorithm left behind.
 
-        for dep in subgraph.get(node, set()):
-            visit(dep)
+    Every remaining cell still has a remaining dependency, so following
+    dependencies from any of them must eventually revisit a cell.
+    """
+    remaining_set = set(remaining)
+    path: list[str] = []
+    position: dict[str, int] = {}
 
-        temp_visited.remove(node)
-        visited.add(node)
-        result.append(node)
+    node = remaining[0]
+    while node not in position:
+        position[node] = len(path)
+        path.append(node)
+        node = next(dep for dep in subgraph[node] if dep in remaining_set)
 
-    for cell_id in cell_ids:
-        if cell_id not in visited:
-            visit(cell_id)
+    return path[position[node]:]
 
-    return result
 
-
-def detect_cycle(graph: dict[str, set[str]]) -> Optional[list[str]]:
+def order_or_cycle(graph: dict[str, set[str]], cell_ids: set[str]) -> tuple[list[str], Optional[list[str]]]:
     """
-    Detect if there's a circular dependency in the graph.
+    Topologically sort a subset of cells, detecting cycles in the same pass.
 
     Args:
-        graph: Dependency graph (cell_id -> upstream dependencies)
+        graph: Full dependency graph
+        cell_ids: Subset of cell_ids to sort
 
     Returns:
-        List of cell_ids forming a cycle, or None if no cycle exists
+        Tuple of (order, cycle) where:
+        - order: List of cell_ids in execution order, or [] if there is a cycle
+        - cycle: List of cell_ids forming a cycle within the subset, or None
     """
-    WHITE, GRAY, BLACK = 0, 1, 2
-    color = {node: WHITE for node in graph}
-    parent = {node: None for node in graph}
+    subgraph = _restrict_graph(graph, cell_ids)
+    order, remaining = _kahn_order(subgraph)
 
-    def dfs(node: str) -> Optional[list[str]]:
-        color[node] = GRAY
+    if remaining:
+        return [], _extract_cycle(subgraph, remaining)
 
-        for neighbor in graph.get(node, set()):
-            if neighbor not in color:
-                continue
+    return order, None
 
-            if color[neighbor] == GRAY:
-                # Found a cycle - reconstruct it
-                cycle = [neighbor, node]
-                current = node
-                while parent[current] and parent[current] != neighbor:
-                    current = parent[current]
-                    cycle.append(current)
-                return cycle
 
-            if color[neighbor] == WHITE:
-                parent[neighbor] = node
-                result = dfs(neighbor)
-                if result:
-                    return result
+def topological_sort(graph: dict[str, set[str]], cell_ids: set[str]) -> list[str]:
+    """
+    Topologically sort a subset of cells based on dependencies.
 
-        color[node] = BLACK
-        return None
+    Ties are broken by the order of cells in the graph (notebook order).
 
-    for node in graph:
-        if color[node] == WHITE:
-            result = dfs(node)
-            if result:
-                return result
+    Args:
+        graph: Full dependency graph
+        cell_ids: Subset of cell_ids to sort
 
-    return None
+    Returns:
+        List of cell_ids in execution order (dependencies first)
+    """
+    order, remaining = _kahn_order(_restrict_graph(graph, cell_ids))
 
+    # Cells on a cycle can't be ordered; keep them at the end
+    return order + remaining
 
-def get_execution_order(cells: list[Cell], changed_cell_id: str) -> tuple[list[str], Optional[list[str]]]:
+
+def detect_cycle(graph: dict[str, set[str]]) -> Optional[list[str]]:
+    """
+    Detect if there's a circular dependency in the graph.
+
+    Args:
+        graph: Dependency graph (cell_id -> upstream dependencies)
+
+    Returns:
+        List of cell_ids forming a cycle, or None if no cycle exists
+    """
+    _, cycle = order_or_cycle(graph, set(graph))
+    return cycle
+
+
+def get_execution_order(
+    cells: list[Cell],
+    changed_cell_id: str,
+    index: Optional[DependencyIndex] = None,
+) -> tuple[list[str], Optional[list[str]]]:
     """
     Get the execution order for cells after a cell changes.
 
+    Only the changed cell and its downstream dependents are checked for
+    cycles, so an unrelated cycle elsewhere doesn't block execution.
+
     Args:
         cells: All cells in the notebook
         changed_cell_id: The cell that was modified/run
+        index: Optional persistent index (see build_dependency_graphs)
 
     Returns:
         Tuple of (execution_order, cycle) where:
         - execution_order: List of cell_ids to execute (including changed cell)
         - cycle: List of cell_ids forming a cycle, or None
     """
-    graph = build_dependency_graph(cells)
+    graph, reverse_graph = build_dependency_graphs(cells, index)
 
-    # Check for cycles
-    cycle = detect_cycle(graph)
-    if cycle:
-        return [], cycle
+    # A cell that isn't in the notebook (e.g. deleted meanwhile) runs nothing
+    if changed_cell_id not in graph:
+        return [], None
 
-    # Get downstream cells
-    downstream = get_downstream_cells(graph, changed_cell_id)
+    # Get downstream cells, including the changed cell itself
+    to_execute = get_downstream_cells(graph, changed_cell_id, reverse_graph) | {changed_cell_id}
 
-    # Include the changed cell itself
-    to_execute = downstream | {changed_cell_id}
+    # Sort in execution order, detecting cycles in the same pass. Every
+    # dependent of a downstream cell is itself downstream, so the reverse
+    # graph from the build doubles as the sort's adjacency.
+    subgraph = _restrict_graph(graph, to_execute)
+    order, remaining = _kahn_order(subgraph, reverse_graph)
 
-    # Sort in execution order
-    order = topological_sort(graph, to_execute)
+    if remaining:
+        return [], _extract_cycle(subgraph, remaining)
 
     return order, None
+
+
+def get_full_execution_order(
+    graph: dict[str, set[str]],
+    cell_ids: set[str],
+) -> tuple[list[str], list[list[str]], list[str]]:
+    """
+    Order a whole set of cells for a single pass, working around cycles.
+
+    Unlike order_or_cycle, a cycle doesn't stop the cells that can still be
+    ordered: they are returned as usual, while the cells on each cycle and
+    the cells behind them are returned separately.
+
+    Args:
+        graph: Full dependency graph
+        cell_ids: Subset of cell_ids to order
+
+    Returns:
+        Tuple of (order, cycles, blocked) where:
+        - order: Cells that can run, dependencies first
+        - cycles: Disjoint cycles found among the remaining cells
+        - blocked: Remaining cells downstream of a cycle, dependencies first
+    """
+    subgraph = _restrict_graph(graph, cell_ids)
+    order, remaining = _kahn_order(subgraph)
+
+    cycles: list[list[str]] = []
+    blocked: list[str] = []
+    while remaining:
+        cycle = _extract_cycle(subgraph, remaining)
+        cycles.append(cycle)
+
+        # Treat the cycle as resolved; cells it was holding back become
+        # orderable (and blocked), anything left sits on another cycle
+        on_cycle = set(cycle)
+        rest = {cid for cid in remaining if cid not in on_cycle}
+        subgraph = _restrict_graph(subgraph, rest)
+        freed, remaining = _kahn_order(subgraph)
+        blocked.extend(freed)
+
+    return order, cycles, blocked
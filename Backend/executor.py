@@ -4,28 +4,80 @@ Execution Engine Module
 Executes Python code cells with:
 - Shared namespace (globals dict)
 - Output capture (stdout, _result variable)
-- DataFrame rendering (to_html conversion)
+- DataFrame rendering (Arrow or to_html conversion)
+- Rich HTML rendering of objects with _repr_html_
 - Error handling
 """
 
+import ast
+import base64
+import builtins
 import io
 import sys
+import threading
 import contextlib
 import traceback
+import types
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import Any, Optional
+from typing import Any, Iterable, Optional
 
 from parser import Cell
+from dependency import analyze_cell
 
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+except ImportError:
+    # Optional: DataFrames fall back to HTML rendering
+    pa = None
+    pa_ipc = None
 
-@dataclass
+
+# Maximum number of DataFrame rows and columns sent to the frontend
+PREVIEW_ROWS = 50
+PREVIEW_COLUMNS = 40
+
+# Marks names that did not exist before a cell ran
+_MISSING = object()
+
+# Maximum number of stack frames shown in a cell traceback
+TRACEBACK_LIMIT = 20
+
+# Maximum number of cells whose last result is kept for replay
+RESULT_CACHE_SIZE = 128
+
+# Immutable values that are cheap to compare; the result cache only keys on
+# (and only checks outputs of) these, so it never hashes or copies large data
+_SCALAR_TYPES = (type(None), bool, int, float, complex, str, bytes)
+
+# Longest str/bytes value the result cache compares
+MAX_CACHED_SCALAR_LEN = 4096
+
+# Nodes whose effects reach beyond the names a cell writes, so a cell
+# containing them is always re-executed rather than replayed from cache
+_IMPURE_NODES = (
+    ast.Import, ast.ImportFrom, ast.Global, ast.Nonlocal, ast.Delete,
+    ast.With, ast.AsyncWith, ast.FunctionDef, ast.AsyncFunctionDef,
+    ast.ClassDef, ast.Lambda, ast.Await, ast.Yield, ast.YieldFrom,
+)
+
+# Built-ins that only compute a value (print only writes captured stdout)
+_PURE_CALLS = frozenset({
+    'print', 'len', 'range', 'str', 'int', 'float', 'bool', 'list', 'dict',
+    'set', 'frozenset', 'tuple', 'repr', 'sum', 'min', 'max', 'abs', 'round',
+    'sorted', 'reversed', 'enumerate', 'zip', 'any', 'all', 'isinstance',
+})
+
+
+@dataclass(slots=True)
 class ExecutionResult:
     """Result of executing a cell."""
     cell_id: str
     success: bool
     stdout: str = ""
-    result: Optional[str] = None  # Rendered result (HTML or text)
-    result_type: str = "text"  # "text", "html", "error"
+    result: Optional[str] = None  # Rendered result (HTML, base64 Arrow, or text)
+    result_type: str = "text"  # "text", "html", "arrow", "error"
     error: Optional[str] = None
     error_traceback: Optional[str] = None
 
@@ -36,10 +88,22 @@ class Executor:
     """
 
     def __init__(self):
-        # Shared namespace for all cells
+        # Shared namespace for all cells. The builtins dict is seeded
+        # explicitly so exec never has to look up and insert it itself
         self.namespace: dict[str, Any] = {
-            "__builtins__": __builtins__,
+            "__builtins__": builtins.__dict__,
         }
+        # Serializes execution: cells share one globals dict, stdout
+        # redirection is process-wide, and _result is popped after exec
+        self._lock = threading.RLock()
+        # Scratch buffer for rendering figures, reused across cells
+        self._img_buf = io.BytesIO()
+        # Captured stdout/stderr of the running cell, reused across cells
+        self._out_buf = io.StringIO()
+        # Compiled code per cell: cell_id -> (source, code object, replay inputs)
+        self._code_cache: dict[str, tuple[str, types.CodeType, Optional[frozenset[str]]]] = {}
+        # Last result of pure cells: cell_id -> (input key, output values, result)
+        self._result_cache: OrderedDict[str, tuple[tuple, tuple, ExecutionResult]] = OrderedDict()
         # Pre-import common libraries
         self._setup_namespace()
 
@@ -57,9 +121,42 @@ import numpy as np
 
     def reset_namespace(self):
         """Reset the namespace to initial state."""
-        self.namespace.clear()
-        self.namespace["__builtins__"] = __builtins__
-        self._setup_namespace()
+        with self._lock:
+            self.namespace.clear()
+            self.namespace["__builtins__"] = builtins.__dict__
+            # Compiled code doesn't depend on the namespace and is kept;
+            # cached results do
+            self._result_cache.clear()
+            self._setup_namespace()
+
+    def forget_cell(self, cell_id: str):
+        """Drop the compiled code and cached result of a deleted cell."""
+        with self._lock:
+            self._code_cache.pop(cell_id, None)
+            self._result_cache.pop(cell_id, None)
+
+    def _compile_cell(self, cell_id: str, code: str) -> tuple[types.CodeType, Optional[frozenset[str]]]:
+        """
+        Compile cell code, reusing the cached code object if unchanged.
+
+        Returns:
+            Tuple of (code object, replay inputs), where replay inputs is
+            None unless the cell can be replayed from the result cache
+
+        Raises:
+            SyntaxError if the code does not compile
+        """
+        cached = self._code_cache.get(cell_id)
+        if cached is not None and cached[0] == code:
+            return cached[1], cached[2]
+
+        filename = f"<cell {cell_id}>"
+        tree = ast.parse(code, filename)
+        code_obj = compile(tree, filename, "exec")
+        replay_inputs = _replay_inputs(tree)
+
+        self._code_cache[cell_id] = (code, code_obj, replay_inputs)
+        return code_obj, replay_inputs
 
     def execute_cell(self, cell: Cell) -> ExecutionResult:
         """
@@ -68,6 +165,8 @@ import numpy as np
         For Python cells: executes code with exec()
         For SQL cells: handled separately (see database.py)
 
+        Safe to call from multiple threads; executions are serialized.
+
         Args:
             cell: The Cell to execute
 
@@ -83,13 +182,9 @@ import numpy as np
                 error="SQL cells must be executed through the database module",
             )
 
-        return self._execute_python_cell(cell)
-
-    def _execute_python_cell(self, cell: Cell) -> ExecutionResult:
-        """Execute a Python cell."""
-        code = cell.code.strip()
-
-        if not code:
+        # Empty cells need neither the lock nor a compile; isspace() checks
+        # without copying the code the way strip() would
+        if not cell.code or cell.code.isspace():
             return ExecutionResult(
                 cell_id=cell.id,
                 success=True,
@@ -97,13 +192,43 @@ import numpy as np
                 result=None,
             )
 
-        # Capture stdout
-        stdout_capture = io.StringIO()
+        with self._lock:
+            return self._execute_python_cell(cell)
+
+    def _execute_python_cell(self, cell: Cell) -> ExecutionResult:
+        """Execute a non-empty Python cell."""
+        code = cell.code.strip()
+        stdout_capture = None
+        saved = None
+        cache_key = None
 
         try:
-            with contextlib.redirect_stdout(stdout_capture):
-                with contextlib.redirect_stderr(stdout_capture):
-                    exec(code, self.namespace)
+            code_obj, replay_inputs = self._compile_cell(cell.id, code)
+
+            if replay_inputs is not None:
+                cache_key = self._result_key(code, replay_inputs)
+                cached = self._result_cache.get(cell.id)
+                # Replay only if the inputs match and the outputs still hold
+                # the values this cell produced last time
+                if (
+                    cached is not None
+                    and cache_key is not None
+                    and cached[0] == cache_key
+                    and self._scalar_values(analyze_cell(cell).writes) == cached[1]
+                ):
+                    self._result_cache.move_to_end(cell.id)
+                    return cached[2]
+
+            # Remember the values of everything this cell writes so a
+            # failure halfway through doesn't leave partial state behind
+            saved = self._snapshot(analyze_cell(cell).writes)
+
+            # Capture stdout and stderr into the emptied shared buffer
+            stdout_capture = self._out_buf
+            stdout_capture.seek(0)
+            stdout_capture.truncate()
+            with contextlib.redirect_stdout(stdout_capture), contextlib.redirect_stderr(stdout_capture):
+                exec(code_obj, self.namespace)
 
             # Get captured stdout
             stdout = stdout_capture.getvalue()
@@ -116,18 +241,24 @@ import numpy as np
                 raw_result = self.namespace.pop("_result")
                 result, result_type = self._render_result(raw_result)
 
-            return ExecutionResult(
+            exec_result = ExecutionResult(
                 cell_id=cell.id,
                 success=True,
                 stdout=stdout,
                 result=result,
                 result_type=result_type,
             )
+            if cache_key is not None:
+                self._cache_result(cell, cache_key, exec_result)
+            return exec_result
 
         except Exception as e:
+            if saved is not None:
+                self._restore(saved)
+
             # Capture the exception
-            stdout = stdout_capture.getvalue()
-            error_tb = traceback.format_exc()
+            stdout = stdout_capture.getvalue() if stdout_capture else ""
+            error_tb = _format_cell_traceback(e)
 
             return ExecutionResult(
                 cell_id=cell.id,
@@ -138,6 +269,65 @@ import numpy as np
                 result_type="error",
             )
 
+    def _scalar_values(self, names: Iterable[str]) -> Optional[tuple]:
+        """
+        Capture the current values of the given names for the result cache.
+
+        Returns:
+            Sorted tuple of (name, type, value), or None if any value isn't
+            a small immutable scalar
+        """
+        namespace = self.namespace
+        values = []
+        for name in sorted(names):
+            value = namespace.get(name, _MISSING)
+            if value is not _MISSING:
+                if type(value) not in _SCALAR_TYPES:
+                    return None
+                if isinstance(value, (str, bytes)) and len(value) > MAX_CACHED_SCALAR_LEN:
+                    return None
+            # The type keeps 1, 1.0 and True apart
+            values.append((name, type(value), value))
+        return tuple(values)
+
+    def _result_key(self, code: str, names: Iterable[str]) -> Optional[tuple]:
+        """Key a cell run on its code and the values of every name it touches."""
+        values = self._scalar_values(names)
+        if values is None:
+            return None
+        return (code, values)
+
+    def _cache_result(self, cell: Cell, cache_key: tuple, exec_result: ExecutionResult):
+        """Remember a pure cell's result along with the outputs it produced."""
+        outputs = self._scalar_values(analyze_cell(cell).writes)
+        if outputs is None:
+            self._result_cache.pop(cell.id, None)
+            return
+
+        self._result_cache[cell.id] = (cache_key, outputs, exec_result)
+        self._result_cache.move_to_end(cell.id)
+        if len(self._result_cache) > RESULT_CACHE_SIZE:
+            self._result_cache.popitem(last=False)
+
+    def _snapshot(self, names: set[str]) -> dict[str, Any]:
+        """Capture the current bindings of the given names."""
+        namespace = self.namespace
+        return {name: namespace.get(name, _MISSING) for name in names}
+
+    def _restore(self, saved: dict[str, Any]):
+        """
+        Roll names back to a snapshot taken with _snapshot.
+
+        Only bindings are restored; in-place mutation of existing objects
+        (e.g. list.append) is not undone.
+        """
+        namespace = self.namespace
+        for name, value in saved.items():
+            if value is _MISSING:
+                namespace.pop(name, None)
+            else:
+                namespace[name] = value
+
     def _render_result(self, value: Any) -> tuple[str, str]:
         """
         Render a result value to a displayable format.
@@ -146,17 +336,23 @@ import numpy as np
             value: The value to render
 
         Returns:
-            Tuple of (rendered_string, type) where type is "html" or "text"
+            Tuple of (rendered_string, type) where type is "arrow", "html" or "text"
         """
         # Check for DataFrame-like objects (pandas)
         if hasattr(value, 'to_html'):
+            if pa is not None:
+                try:
+                    return self._render_arrow(value), "arrow"
+                except Exception:
+                    pass
+
             try:
-                # Limit rows for large DataFrames
-                if hasattr(value, 'shape') and value.shape[0] > 50:
-                    html = value.head(50).to_html(classes='dataframe', index=True)
-                    html += f"<p><em>Showing 50 of {value.shape[0]} rows</em></p>"
-                else:
-                    html = value.to_html(classes='dataframe', index=True)
+                # Only the preview is rendered; pandas' HTML writer is slow
+                preview = _preview_frame(value)
+                html = preview.to_html(classes='dataframe', index=True)
+                note = _truncation_note(preview, value)
+                if note:
+                    html += f"<p><em>{note}</em></p>"
                 return html, "html"
             except Exception:
                 pass
@@ -164,22 +360,73 @@ import numpy as np
         # Check for matplotlib figures
         if hasattr(value, 'savefig'):
             try:
-                buf = io.BytesIO()
-                value.savefig(buf, format='png', bbox_inches='tight')
+                buf = self._img_buf
                 buf.seek(0)
-                import base64
-                img_str = base64.b64encode(buf.read()).decode()
+                buf.truncate()
+                # Skip the tight-bbox layout pass and use light PNG compression:
+                # re-renders happen on every edit, so encode speed beats size
+                value.savefig(
+                    buf,
+                    format='png',
+                    bbox_inches=None,
+                    pil_kwargs={'compress_level': 1, 'optimize': False},
+                )
+                with buf.getbuffer() as view:
+                    img_str = base64.b64encode(view).decode()
                 html = f'<img src="data:image/png;base64,{img_str}" />'
                 return html, "html"
             except Exception:
                 pass
 
+        # Any other object with a rich HTML representation (styled frames,
+        # polars frames, sympy expressions, ...), rendered without importing
+        # its library
+        repr_html = getattr(value, '_repr_html_', None)
+        if callable(repr_html):
+            try:
+                html = repr_html()
+                if isinstance(html, str):
+                    return html, "html"
+            except Exception:
+                pass
+
         # Default: convert to string representation
         try:
             return repr(value), "text"
         except Exception:
             return str(value), "text"
 
+    def _render_arrow(self, df: Any) -> str:
+        """
+        Encode a DataFrame preview as a base64 Arrow IPC stream.
+
+        Columnar Arrow is much smaller than an HTML table and the frontend
+        decodes it without parsing markup. The total row and column counts
+        are stored in the schema metadata so the frontend can show a
+        truncation note.
+        """
+        preview = _preview_frame(df)
+
+        table = pa.Table.from_pandas(preview, preserve_index=True)
+        metadata = dict(table.schema.metadata or {})
+        metadata[b"total_rows"] = str(df.shape[0]).encode()
+        metadata[b"total_columns"] = str(df.shape[1]).encode()
+        table = table.replace_schema_metadata(metadata)
+
+        sink = pa.BufferOutputStream()
+        with pa_ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return base64.b64encode(sink.getvalue()).decode()
+
+    def render_value(self, value: Any) -> tuple[str, str]:
+        """
+        Render a value produced outside a Python cell (e.g. a SQL result).
+
+        Returns:
+            Tuple of (rendered_string, type) as for cell results
+        """
+        return self._render_result(value)
+
     def get_variable(self, name: str) -> Any:
         """Get a variable from the namespace."""
         return self.namespace.get(name)
@@ -199,6 +446,70 @@ import numpy as np
         self.namespace[var_name] = data
 
 
+def _preview_frame(df: Any) -> Any:
+    """Cut a DataFrame down to the rows and columns sent to the frontend."""
+    rows, columns = df.shape
+    if rows > PREVIEW_ROWS or columns > PREVIEW_COLUMNS:
+        return df.iloc[:PREVIEW_ROWS, :PREVIEW_COLUMNS]
+    return df
+
+
+def _truncation_note(preview: Any, df: Any) -> str:
+    """Describe how much of a DataFrame a preview leaves out ('' if nothing)."""
+    parts = []
+    if preview.shape[0] < df.shape[0]:
+        parts.append(f"{preview.shape[0]} of {df.shape[0]} rows")
+    if preview.shape[1] < df.shape[1]:
+        parts.append(f"{preview.shape[1]} of {df.shape[1]} columns")
+    return f"Showing {', '.join(parts)}" if parts else ""
+
+
+def _replay_inputs(tree: ast.Module) -> Optional[frozenset[str]]:
+    """
+    Find the names a pure cell's result depends on.
+
+    Pure cells can be replayed from the result cache while these names keep
+    their values. Any call other than a value-only builtin, and any store
+    into an attribute or subscript (in-place mutation), makes a cell impure.
+
+    Returns:
+        Every name the cell loads, or None if the cell is impure
+    """
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, _IMPURE_NODES):
+            return None
+        if isinstance(node, ast.Name):
+            if isinstance(node.ctx, ast.Load):
+                names.add(node.id)
+        elif isinstance(node, ast.AugAssign):
+            if isinstance(node.target, ast.Name):
+                names.add(node.target.id)
+        elif isinstance(node, ast.Call):
+            if not (isinstance(node.func, ast.Name) and node.func.id in _PURE_CALLS):
+                return None
+        elif isinstance(node, (ast.Attribute, ast.Subscript)):
+            if not isinstance(node.ctx, ast.Load):
+                return None
+    return frozenset(names)
+
+
+def _format_cell_traceback(exc: Exception) -> str:
+    """
+    Format an exception raised by cell code for display.
+
+    Frames belonging to the executor itself are dropped so the traceback
+    starts at the cell, and only the innermost frames are kept for deep
+    stacks. Syntax errors show just the offending line.
+    """
+    if isinstance(exc, SyntaxError):
+        return "".join(traceback.format_exception_only(type(exc), exc))
+
+    # The first frame is _execute_python_cell calling exec/eval
+    tb = exc.__traceback__.tb_next if exc.__traceback__ else None
+    return "".join(traceback.format_exception(type(exc), exc, tb, limit=-TRACEBACK_LIMIT))
+
+
 def format_output(result: ExecutionResult) -> dict:
     """
     Format execution result for API response.
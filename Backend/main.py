@@ -10,23 +10,36 @@ Provides:
 import os
 import json
 import asyncio
+import threading
 from typing import Optional
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse
 from pydantic import BaseModel
 
-from parser import Cell, parse_notebook_file, serialize_notebook_file, create_cell, find_cell_by_id, remove_cell_by_id
+try:
+    import orjson
+except ImportError:
+    # Optional: WebSocket messages fall back to the stdlib encoder
+    orjson = None
+
+from parser import Cell, CellRegistry, parse_notebook_file, serialize_notebook_file, create_cell, find_cell_by_id
 from reactor import Reactor, CellState, CellStatus, cell_state_to_dict
-from database import DatabaseManager
+from database import DatabaseManager, status_frame
+from dependency import SQL_PARAMS_VAR, load_analysis_store, save_analysis_store, uses_sql_params
 
 
 # --- Configuration ---
 
 NOTEBOOK_FILE = os.environ.get("NOTEBOOK_FILE", "notebook.py")
+# Cell analyses persisted across restarts, next to the notebook by default
+ANALYSIS_STORE_FILE = os.environ.get(
+    "ANALYSIS_STORE_FILE",
+    os.path.splitext(NOTEBOOK_FILE)[0] + ".analysis.json"
+)
 # Support both local dev and Docker paths
 FRONTEND_DIR = os.environ.get(
     "FRONTEND_DIR",
@@ -62,67 +75,125 @@ class CellResponse(BaseModel):
 
 # --- Global State ---
 
-cells: list[Cell] = []
+cells: CellRegistry = CellRegistry()
 reactor: Reactor = Reactor()
 db_manager: DatabaseManager = DatabaseManager()
-websocket_connections: list[WebSocket] = []
+websocket_connections: set[WebSocket] = set()
+# Bumped on every change to the cells list; clients apply deltas in order
+# and resync from GET /cells when they see a gap
+cells_version: int = 0
+# Bumped whenever cell states change, alongside cells_version
+states_version: int = 0
+# Encoded init message, reused by new connections until either version changes
+_init_payload: Optional[tuple[tuple, str]] = None
+
+# Notebook writes are debounced so a burst of changes costs one write
+SAVE_DEBOUNCE_INTERVAL = 0.25  # seconds
+_save_task: Optional[asyncio.Task] = None
+_save_requested = False
+# Keeps a background write and the shutdown save from interleaving
+_save_lock = threading.Lock()
+
+# Status updates are coalesced per cell and flushed as one frame per burst
+STATUS_BATCH_INTERVAL = 0.02  # seconds
+_pending_status: dict[str, CellState] = {}
+_status_flush_task: Optional[asyncio.Task] = None
 
 
 # --- WebSocket Broadcast ---
 
-async def broadcast_status(cell_id: str, state: CellState):
-    """Broadcast cell status update to all connected WebSocket clients."""
+async def broadcast_cell_upserted(cell: Cell):
+    """Broadcast a created or edited cell and its position."""
+    global cells_version
+    cells_version += 1
     message = {
-        "type": "status",
-        "data": cell_state_to_dict(state),
+        "type": "cell_upserted",
+        "version": cells_version,
+        "index": cells.index_of(cell.id),
+        "data": cell_to_response(cell),
     }
     await broadcast_message(message)
 
 
-async def broadcast_cells_updated():
-    """Broadcast that cells list has changed."""
+async def broadcast_cell_deleted(cell_id: str):
+    """Broadcast that a cell was removed."""
+    global cells_version
+    cells_version += 1
     message = {
-        "type": "cells_updated",
-        "data": [cell_to_response(c) for c in cells],
+        "type": "cell_deleted",
+        "version": cells_version,
+        "id": cell_id,
     }
     await broadcast_message(message)
 
 
+def encode_message(message: dict) -> str:
+    """Serialize a WebSocket message to JSON text."""
+    if orjson is not None:
+        return orjson.dumps(message).decode()
+    return json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+
+
 async def broadcast_message(message: dict):
     """Send message to all connected WebSocket clients."""
     if not websocket_connections:
         return
 
-    disconnected = []
-    for ws in websocket_connections:
-        try:
-            await ws.send_json(message)
-        except Exception:
-            disconnected.append(ws)
+    # Serialize once, then send the same text to every client concurrently
+    payload = encode_message(message)
+    targets = list(websocket_connections)
+    results = await asyncio.gather(
+        *(ws.send_text(payload) for ws in targets),
+        return_exceptions=True,
+    )
 
     # Clean up disconnected clients
-    for ws in disconnected:
-        if ws in websocket_connections:
-            websocket_connections.remove(ws)
+    for ws, result in zip(targets, results):
+        if isinstance(result, Exception):
+            websocket_connections.discard(ws)
+
+
+async def flush_status_batch():
+    """Wait out the batch window, then broadcast the latest state of each pending cell."""
+    global _status_flush_task
+    await asyncio.sleep(STATUS_BATCH_INTERVAL)
+
+    batch = [cell_state_to_dict(state) for state in _pending_status.values()]
+    _pending_status.clear()
+    # Updates queued from here on start a new batch
+    _status_flush_task = None
+
+    if batch:
+        await broadcast_message({"type": "status_batch", "data": batch})
+
+
+def queue_status(cell_id: str, state: CellState):
+    """Queue a status update for the next batch (must run on the event loop)."""
+    global _status_flush_task, states_version
+    states_version += 1
+    _pending_status[cell_id] = state
+    if _status_flush_task is None:
+        _status_flush_task = asyncio.create_task(flush_status_batch())
 
 
 def sync_status_callback(cell_id: str, state: CellState):
-    """Synchronous wrapper for async broadcast (called from reactor)."""
-    try:
-        loop = asyncio.get_event_loop()
-        if loop.is_running():
-            asyncio.create_task(broadcast_status(cell_id, state))
-        else:
-            loop.run_until_complete(broadcast_status(cell_id, state))
-    except RuntimeError:
-        # No event loop, skip broadcast
-        pass
+    """Thread-safe bridge from the reactor to the event loop's status batch."""
+    loop = getattr(app.state, "loop", None)
+    if loop is None or loop.is_closed():
+        # App not started, skip broadcast
+        return
+    loop.call_soon_threadsafe(queue_status, cell_id, state)
 
 
 # --- Helper Functions ---
 
 def cell_to_response(cell: Cell) -> dict:
-    """Convert Cell to API response format."""
+    """
+    Convert Cell to API response format.
+
+    The result is already JSON-safe, so the heavier endpoints wrap it in a
+    JSONResponse directly instead of letting FastAPI re-encode it.
+    """
     return {
         "id": cell.id,
         "type": cell.cell_type,
@@ -131,28 +202,101 @@ def cell_to_response(cell: Cell) -> dict:
     }
 
 
+def init_payload() -> str:
+    """Get the encoded init message, rebuilding it only after a change."""
+    global _init_payload
+    key = (cells_version, states_version, db_manager.is_connected())
+    if _init_payload is None or _init_payload[0] != key:
+        _init_payload = (key, encode_message({
+            "type": "init",
+            "data": {
+                "cells": [cell_to_response(c) for c in cells],
+                "states": {cid: cell_state_to_dict(s) for cid, s in reactor.get_all_states().items()},
+                "db_connected": key[2],
+                "version": cells_version,
+            },
+        }))
+    return _init_payload[1]
+
+
 def load_notebook():
     """Load notebook from file."""
     global cells
+    load_analysis_store(ANALYSIS_STORE_FILE)
     if os.path.exists(NOTEBOOK_FILE):
         try:
-            cells = parse_notebook_file(NOTEBOOK_FILE)
+            cells = CellRegistry(parse_notebook_file(NOTEBOOK_FILE))
         except Exception as e:
             print(f"Error loading notebook: {e}")
-            cells = []
+            cells = CellRegistry()
     else:
-        cells = []
+        cells = CellRegistry()
     reactor.set_cells(cells)
 
 
-def save_notebook():
-    """Save notebook to file."""
+def save_notebook(snapshot: Optional[list[Cell]] = None):
+    """Save notebook to file (the current cells unless a snapshot is given)."""
     try:
-        serialize_notebook_file(cells, NOTEBOOK_FILE)
+        with _save_lock:
+            serialize_notebook_file(cells if snapshot is None else snapshot, NOTEBOOK_FILE)
     except Exception as e:
         print(f"Error saving notebook: {e}")
 
 
+def save_analysis(snapshot: list[Cell]):
+    """Persist cell analyses so the next startup can skip re-parsing."""
+    try:
+        save_analysis_store(snapshot, ANALYSIS_STORE_FILE)
+    except Exception as e:
+        print(f"Error saving analysis store: {e}")
+
+
+async def flush_save():
+    """Wait out the debounce window, then write the notebook off the event loop."""
+    global _save_task, _save_requested
+    try:
+        while True:
+            await asyncio.sleep(SAVE_DEBOUNCE_INTERVAL)
+            _save_requested = False
+            # Snapshot on the loop so the worker thread never sees a half-edited list
+            await asyncio.to_thread(save_notebook, list(cells))
+            # Changes made during the write need another one
+            if not _save_requested:
+                break
+    finally:
+        _save_task = None
+
+
+def schedule_save():
+    """Request a debounced notebook save (must run on the event loop)."""
+    global _save_task, _save_requested
+    _save_requested = True
+    if _save_task is None:
+        _save_task = asyncio.create_task(flush_save())
+
+
+def sql_param_rows(params) -> list:
+    """
+    Check that _sql_params holds rows for a bulk insert.
+
+    Returns:
+        The rows, a list or tuple of row lists/tuples
+
+    Raises:
+        TypeError if params isn't a sequence of rows
+    """
+    if not isinstance(params, (list, tuple)):
+        raise TypeError(
+            f"{SQL_PARAMS_VAR} must be a list of row tuples, got {type(params).__name__}"
+        )
+    for row in params:
+        if not isinstance(row, (list, tuple)):
+            raise TypeError(
+                f"{SQL_PARAMS_VAR} rows must be tuples or lists, got {type(row).__name__}"
+            )
+    return params
+
+
 def execute_sql_cell(cell: Cell):
     """Execute a SQL cell and inject results into namespace."""
     from executor import ExecutionResult
@@ -167,25 +311,22 @@ def execute_sql_cell(cell: Cell):
     var_name = cell.as_var or f"_sql_{cell.id}"
 
     try:
-        df = db_manager.execute_query(cell.code)
+        # An `INSERT ... VALUES %s` template plus rows in _sql_params is
+        # sent as a bulk insert
+        params = reactor.executor.get_variable(SQL_PARAMS_VAR) if uses_sql_params(cell.code) else None
+        if params is not None:
+            df = status_frame(db_manager.execute_many(cell.code, sql_param_rows(params)))
+        else:
+            df = db_manager.execute_query(cell.code)
         reactor.executor.inject_sql_result(var_name, df)
 
-        # Render the result
-        if hasattr(df, 'to_html'):
-            if df.shape[0] > 50:
-                result_html = df.head(50).to_html(classes='dataframe', index=True)
-                result_html += f"<p><em>Showing 50 of {df.shape[0]} rows</em></p>"
-            else:
-                result_html = df.to_html(classes='dataframe', index=True)
-            result_type = "html"
-        else:
-            result_html = str(df)
-            result_type = "text"
+        # Render the result the same way as a Python cell's DataFrame
+        result, result_type = reactor.executor.render_value(df)
 
         return ExecutionResult(
             cell_id=cell.id,
             success=True,
-            result=result_html,
+            result=result,
             result_type=result_type,
         )
 
@@ -205,12 +346,17 @@ def execute_sql_cell(cell: Cell):
 async def lifespan(app: FastAPI):
     """Application lifespan handler."""
     # Startup
-    load_notebook()
+    app.state.loop = asyncio.get_running_loop()
+    # Reading, parsing and analysing the notebook happen off the event loop
+    await asyncio.to_thread(load_notebook)
     reactor.set_status_callback(sync_status_callback)
     print(f"Loaded {len(cells)} cells from {NOTEBOOK_FILE}")
     yield
-    # Shutdown
-    save_notebook()
+    # Shutdown: drop any pending debounced save and write the final state
+    if _save_task is not None:
+        _save_task.cancel()
+    await asyncio.to_thread(save_notebook, list(cells))
+    await asyncio.to_thread(save_analysis, list(cells))
     db_manager.close()
     print("Notebook saved")
 
@@ -244,10 +390,11 @@ async def health_check():
 @app.get("/cells")
 async def get_cells():
     """Get all cells."""
-    return {
+    return JSONResponse({
         "cells": [cell_to_response(c) for c in cells],
         "states": {cid: cell_state_to_dict(s) for cid, s in reactor.get_all_states().items()},
-    }
+        "version": cells_version,
+    })
 
 
 @app.post("/cells")
@@ -259,28 +406,11 @@ async def create_new_cell(cell_data: CellCreate):
         as_var=cell_data.as_var,
     )
 
-    # Insert at position based on after_id
-    if cell_data.after_id == "":
-        # Empty string means insert at beginning
-        cells.insert(0, new_cell)
-    elif cell_data.after_id:
-        # Insert after specified cell
-        insert_idx = None
-        for i, c in enumerate(cells):
-            if c.id == cell_data.after_id:
-                insert_idx = i + 1
-                break
-        if insert_idx is not None:
-            cells.insert(insert_idx, new_cell)
-        else:
-            cells.append(new_cell)
-    else:
-        # null/None means append at end
-        cells.append(new_cell)
-
-    reactor.set_cells(cells)
-    save_notebook()
-    await broadcast_cells_updated()
+    # Insert after after_id ("" = at the start, null = at the end); the
+    # reactor waits for any run in progress, so do it off the event loop
+    await asyncio.to_thread(reactor.insert_cell, new_cell, cell_data.after_id)
+    schedule_save()
+    await broadcast_cell_upserted(new_cell)
 
     return cell_to_response(new_cell)
 
@@ -302,20 +432,18 @@ async def get_cell(cell_id: str):
 @app.put("/cells/{cell_id}")
 async def update_cell(cell_id: str, cell_data: CellUpdate):
     """Update a cell's code or type."""
-    cell = find_cell_by_id(cells, cell_id)
+    cell = await asyncio.to_thread(
+        reactor.update_cell,
+        cell_id,
+        code=cell_data.code,
+        cell_type=cell_data.type,
+        as_var=cell_data.as_var,
+    )
     if not cell:
         raise HTTPException(status_code=404, detail="Cell not found")
 
-    if cell_data.code is not None:
-        cell.code = cell_data.code
-    if cell_data.type is not None:
-        cell.cell_type = cell_data.type
-    if cell_data.as_var is not None:
-        cell.as_var = cell_data.as_var
-
-    reactor.set_cells(cells)
     # Don't save on every edit - save on run or shutdown to avoid reload loops
-    await broadcast_cells_updated()
+    await broadcast_cell_upserted(cell)
 
     return cell_to_response(cell)
 
@@ -323,32 +451,14 @@ async def update_cell(cell_id: str, cell_data: CellUpdate):
 @app.delete("/cells/{cell_id}")
 async def delete_cell(cell_id: str):
     """Delete a cell and clean up its variables from namespace."""
-    from dependency import analyze_cell
-
-    # Find the cell before deleting
-    cell = find_cell_by_id(cells, cell_id)
-    if not cell:
+    # Drops the cell, its state and the variables it defined once any run
+    # in progress has finished
+    variables_to_remove = await asyncio.to_thread(reactor.remove_cell, cell_id)
+    if variables_to_remove is None:
         raise HTTPException(status_code=404, detail="Cell not found")
 
-    # Analyze what variables this cell defined
-    analysis = analyze_cell(cell)
-    variables_to_remove = analysis.writes
-
-    # Remove cell from list
-    if not remove_cell_by_id(cells, cell_id):
-        raise HTTPException(status_code=404, detail="Cell not found")
-
-    # Remove variables from namespace
-    for var_name in variables_to_remove:
-        if var_name in reactor.executor.namespace:
-            del reactor.executor.namespace[var_name]
-
-    # Clear cell state
-    reactor.clear_cell_state(cell_id)
-
-    reactor.set_cells(cells)
-    save_notebook()
-    await broadcast_cells_updated()
+    schedule_save()
+    await broadcast_cell_deleted(cell_id)
 
     return {"status": "deleted", "id": cell_id, "removed_variables": list(variables_to_remove)}
 
@@ -360,38 +470,43 @@ async def run_cell(cell_id: str):
     if not cell:
         raise HTTPException(status_code=404, detail="Cell not found")
 
-    # Run in background to allow WebSocket updates
-    results = reactor.run_cell(cell_id, sql_executor=execute_sql_cell)
-    save_notebook()
+    # Run on a worker thread so the event loop keeps streaming WebSocket updates
+    results = await asyncio.to_thread(reactor.run_cell, cell_id, execute_sql_cell)
+    schedule_save()
 
-    return {
+    return JSONResponse({
         "results": [cell_state_to_dict(r) for r in results],
-    }
+    })
 
 
 @app.post("/cells/run-all")
 async def run_all():
     """Run all cells in dependency order."""
-    results = reactor.run_all_cells(sql_executor=execute_sql_cell)
-    save_notebook()
+    results = await asyncio.to_thread(reactor.run_all_cells, execute_sql_cell)
+    schedule_save()
 
-    return {
+    return JSONResponse({
         "results": [cell_state_to_dict(r) for r in results],
-    }
+    })
 
 
 @app.post("/cells/reset")
 async def reset_notebook():
     """Reset all cell states and namespace."""
-    reactor.reset()
-    await broadcast_cells_updated()
+    global states_version
+    # Waits for any in-flight run, so keep it off the event loop too
+    await asyncio.to_thread(reactor.reset)
+    states_version += 1
+    # One event for every cell; clients clear their states locally
+    await broadcast_message({"type": "states_reset"})
     return {"status": "reset"}
 
 
 @app.post("/cells/save")
 async def save_notebook_endpoint():
     """Manually save the notebook to disk."""
-    save_notebook()
+    # Snapshot on the loop, as flush_save does, so the write sees one list
+    await asyncio.to_thread(save_notebook, list(cells))
     return {"status": "saved"}
 
 
@@ -428,18 +543,11 @@ async def disconnect_database():
 async def websocket_endpoint(websocket: WebSocket):
     """WebSocket endpoint for real-time updates."""
     await websocket.accept()
-    websocket_connections.append(websocket)
+    websocket_connections.add(websocket)
 
     try:
         # Send initial state
-        await websocket.send_json({
-            "type": "init",
-            "data": {
-                "cells": [cell_to_response(c) for c in cells],
-                "states": {cid: cell_state_to_dict(s) for cid, s in reactor.get_all_states().items()},
-                "db_connected": db_manager.is_connected(),
-            },
-        })
+        await websocket.send_text(init_payload())
 
         # Keep connection alive and handle incoming messages
         while True:
@@ -447,13 +555,12 @@ async def websocket_endpoint(websocket: WebSocket):
                 data = await websocket.receive_json()
                 # Handle client messages if needed
                 if data.get("type") == "ping":
-                    await websocket.send_json({"type": "pong"})
+                    await websocket.send_text(encode_message({"type": "pong"}))
             except WebSocketDisconnect:
                 break
 
     finally:
-        if websocket in websocket_connections:
-            websocket_connections.remove(websocket)
+        websocket_connections.discard(websocket)
 
 
 # --- Static Files (Frontend) ---
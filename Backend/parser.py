@@ -8,12 +8,13 @@ Extracts cells and can serialize them back to .py format.
 """
 
 import re
+import sys
 import uuid
 from dataclasses import dataclass, field
-from typing import Optional
+from typing import Iterator, Optional, Union
 
 
-@dataclass
+@dataclass(slots=True)
 class Cell:
     """Represents a single notebook cell."""
     id: str
@@ -34,10 +35,10 @@ class Cell:
     def from_dict(cls, data: dict) -> "Cell":
         """Create cell from dictionary."""
         return cls(
-            id=data["id"],
+            id=sys.intern(data["id"]),
             code=data.get("code", ""),
-            cell_type=data.get("type", "python"),
-            as_var=data.get("as"),
+            cell_type=sys.intern(data.get("type", "python")),
+            as_var=_intern_optional(data.get("as")),
         )
 
 
@@ -47,6 +48,13 @@ CELL_MARKER_PATTERN = re.compile(
     r'^# %%\s*\[([^\]]+)\]\s*$'
 )
 
+# Same marker, matched across a whole notebook in one scan.
+# Whitespace and field classes exclude newlines so a match stays on one line.
+CELL_MARKER_SCAN_PATTERN = re.compile(
+    r'^# %%[^\S\n]*\[([^\]\n]+)\][^\S\n]*$',
+    re.MULTILINE,
+)
+
 
 def parse_marker(marker_content: str) -> dict:
     """
@@ -56,26 +64,33 @@ def parse_marker(marker_content: str) -> dict:
     Returns: {"id": "abc123", "type": "sql", "as": "users_df"}
     """
     result = {}
-    parts = marker_content.split(',')
 
-    for part in parts:
-        part = part.strip()
-        if ':' in part:
-            key, value = part.split(':', 1)
+    for part in marker_content.split(','):
+        # partition splits at the first colon and reports whether it found one
+        key, sep, value = part.partition(':')
+        if sep:
             result[key.strip()] = value.strip()
 
     return result
 
 
+def _intern_optional(value: Optional[str]) -> Optional[str]:
+    """Intern a string that may be missing."""
+    return sys.intern(value) if value is not None else None
+
+
 def generate_cell_id() -> str:
     """Generate a unique cell ID."""
-    return uuid.uuid4().hex[:8]
+    return sys.intern(uuid.uuid4().hex[:8])
 
 
 def parse_notebook(content: str) -> list[Cell]:
     """
     Parse notebook content into a list of cells.
 
+    Markers are found with a single regex scan and each cell's code is
+    sliced directly from the content between consecutive markers.
+
     Args:
         content: The raw content of a .py notebook file
 
@@ -83,43 +98,27 @@ def parse_notebook(content: str) -> list[Cell]:
         List of Cell objects
     """
     cells = []
-    lines = content.split('\n')
-
-    current_cell = None
-    current_code_lines = []
-
-    for line in lines:
-        match = CELL_MARKER_PATTERN.match(line)
+    matches = list(CELL_MARKER_SCAN_PATTERN.finditer(content))
 
-        if match:
-            # Save previous cell if exists
-            if current_cell is not None:
-                current_cell.code = '\n'.join(current_code_lines).strip()
-                cells.append(current_cell)
+    for i, match in enumerate(matches):
+        # Code runs from the end of this marker to the start of the next
+        code_end = matches[i + 1].start() if i + 1 < len(matches) else len(content)
 
-            # Parse new cell marker
-            marker_data = parse_marker(match.group(1))
+        # Parse cell marker
+        marker_data = parse_marker(match.group(1))
 
-            cell_id = marker_data.get('id', generate_cell_id())
-            cell_type = marker_data.get('type', 'python')
-            as_var = marker_data.get('as')
+        # Only generate an id when the marker lacks one; uuid4() is the most
+        # expensive step of parsing a cell
+        cell_id = marker_data['id'] if 'id' in marker_data else generate_cell_id()
 
-            current_cell = Cell(
-                id=cell_id,
-                code="",
-                cell_type=cell_type,
-                as_var=as_var,
-            )
-            current_code_lines = []
-
-        elif current_cell is not None:
-            # Add line to current cell's code
-            current_code_lines.append(line)
-
-    # Don't forget the last cell
-    if current_cell is not None:
-        current_cell.code = '\n'.join(current_code_lines).strip()
-        cells.append(current_cell)
+        # Ids, types and output names are interned: they are hashed and
+        # compared constantly as dict keys in the reactor and dependency graph
+        cells.append(Cell(
+            id=sys.intern(cell_id),
+            code=content[match.end():code_end].strip(),
+            cell_type=sys.intern(marker_data.get('type', 'python')),
+            as_var=_intern_optional(marker_data.get('as')),
+        ))
 
     return cells
 
@@ -176,7 +175,26 @@ def serialize_notebook(cells: list[Cell]) -> str:
     if not cells:
         return ""
 
-    return '\n\n'.join(serialize_cell(cell) for cell in cells) + '\n'
+    # Write marker tokens straight into one buffer; same output as joining
+    # serialize_cell() results with blank lines
+    out = []
+    append = out.append
+    for cell in cells:
+        append("# %% [id: ")
+        append(cell.id)
+        if cell.cell_type != "python":
+            append(", type: ")
+            append(cell.cell_type)
+        if cell.as_var:
+            append(", as: ")
+            append(cell.as_var)
+        append("]\n")
+        append(cell.code)
+        append("\n\n")
+
+    # Single trailing newline after the last cell
+    out[-1] = "\n"
+    return "".join(out)
 
 
 def serialize_notebook_file(cells: list[Cell], filepath: str) -> None:
@@ -199,21 +217,83 @@ def create_cell(cell_type: str = "python", code: str = "", as_var: Optional[str]
     return Cell(
         id=generate_cell_id(),
         code=code,
-        cell_type=cell_type,
-        as_var=as_var,
+        cell_type=sys.intern(cell_type),
+        as_var=_intern_optional(as_var),
     )
 
 
-def find_cell_by_id(cells: list[Cell], cell_id: str) -> Optional[Cell]:
+class CellRegistry:
+    """
+    Ordered collection of cells with an id index.
+
+    Behaves like a read-only list of cells (iteration, len, indexing) but
+    lookups by id are a single dict probe. Mutate only through the methods
+    below so the index stays in sync.
+    """
+
+    def __init__(self, cells: Optional[list[Cell]] = None):
+        self._cells: list[Cell] = list(cells) if cells else []
+        self._by_id: dict[str, Cell] = {cell.id: cell for cell in self._cells}
+
+    def __iter__(self) -> Iterator[Cell]:
+        return iter(self._cells)
+
+    def __len__(self) -> int:
+        return len(self._cells)
+
+    def __getitem__(self, index: int) -> Cell:
+        return self._cells[index]
+
+    def __contains__(self, cell_id: object) -> bool:
+        return cell_id in self._by_id
+
+    def get(self, cell_id: str) -> Optional[Cell]:
+        """Find a cell by its ID."""
+        return self._by_id.get(cell_id)
+
+    def index_of(self, cell_id: str) -> Optional[int]:
+        """Get the position of a cell, or None if not present."""
+        cell = self._by_id.get(cell_id)
+        if cell is None:
+            return None
+        return self._cells.index(cell)
+
+    def insert(self, index: int, cell: Cell):
+        """Insert a cell at a position."""
+        self._cells.insert(index, cell)
+        self._by_id[cell.id] = cell
+
+    def append(self, cell: Cell):
+        """Add a cell at the end."""
+        self._cells.append(cell)
+        self._by_id[cell.id] = cell
+
+    def remove(self, cell_id: str) -> bool:
+        """Remove a cell by its ID. Returns True if found and removed."""
+        cell = self._by_id.pop(cell_id, None)
+        if cell is None:
+            return False
+        self._cells.remove(cell)
+        return True
+
+
+CellCollection = Union[list[Cell], CellRegistry]
+
+
+def find_cell_by_id(cells: CellCollection, cell_id: str) -> Optional[Cell]:
     """Find a cell by its ID."""
+    if isinstance(cells, CellRegistry):
+        return cells.get(cell_id)
     for cell in cells:
         if cell.id == cell_id:
             return cell
     return None
 
 
-def remove_cell_by_id(cells: list[Cell], cell_id: str) -> bool:
+def remove_cell_by_id(cells: CellCollection, cell_id: str) -> bool:
     """Remove a cell by its ID. Returns True if found and removed."""
+    if isinstance(cells, CellRegistry):
+        return cells.remove(cell_id)
     for i, cell in enumerate(cells):
         if cell.id == cell_id:
             cells.pop(i)
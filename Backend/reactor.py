@@ -8,15 +8,30 @@ Orchestrates reactive execution of notebook cells:
 - Provides status updates via callbacks
 """
 
-from dataclasses import dataclass
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from enum import Enum
 from typing import Callable, Optional, Any
 
-from parser import Cell, find_cell_by_id
-from dependency import get_execution_order, build_dependency_graph
+from parser import Cell, CellCollection, CellRegistry, remove_cell_by_id
+from dependency import (
+    DependencyIndex,
+    analyze_cell,
+    invalidate_analysis,
+    get_execution_order,
+    build_dependency_graph,
+    find_independent_groups,
+    get_full_execution_order,
+)
 from executor import Executor, ExecutionResult
 
 
+# Upper bound on independent groups run at once by run_all_cells
+MAX_PARALLEL_GROUPS = 4
+
+
 class CellStatus(str, Enum):
     """Possible cell execution statuses."""
     IDLE = "idle"
@@ -26,7 +41,7 @@ class CellStatus(str, Enum):
     BLOCKED = "blocked"
 
 
-@dataclass
+@dataclass(slots=True)
 class CellState:
     """Runtime state of a cell."""
     cell_id: str
@@ -37,6 +52,14 @@ class CellState:
     error: Optional[str] = None
     error_traceback: Optional[str] = None
     blocked_by: Optional[str] = None  # Cell ID that blocked this cell
+    # Serialized form, republished by the Reactor after each change it makes
+    _as_dict: Optional[dict] = field(default=None, init=False, repr=False, compare=False)
+
+    def __setattr__(self, name, value):
+        # Any other assignment makes the published dict stale
+        if name != "_as_dict":
+            object.__setattr__(self, "_as_dict", None)
+        object.__setattr__(self, name, value)
 
 
 # Type for status update callback
@@ -50,28 +73,142 @@ class Reactor:
 
     def __init__(self, executor: Optional[Executor] = None):
         self.executor = executor or Executor()
-        self.cells: list[Cell] = []
+        self.cells: CellCollection = []
+        self._cells_by_id: dict[str, Cell] = {}
         self.cell_states: dict[str, CellState] = {}
         self._status_callback: Optional[StatusCallback] = None
-
-    def set_cells(self, cells: list[Cell]):
+        self._dependency_index = DependencyIndex()
+        # Runs may be started from worker threads; one reactive run at a time
+        self._run_lock = threading.RLock()
+        # Guards the memoized graph and orders when groups run in parallel
+        self._cache_lock = threading.Lock()
+        # Graph and execution orders memoized against a notebook fingerprint
+        self._fingerprint: Optional[int] = None
+        self._graph_cache: Optional[dict[str, set[str]]] = None
+        self._order_cache: dict[str, tuple[list[str], Optional[list[str]]]] = {}
+        self._group_order_cache: dict[tuple[str, ...], tuple[list[str], list[list[str]], list[str]]] = {}
+
+    def set_cells(self, cells: CellCollection):
         """Set the cells to manage."""
-        self.cells = cells
-        # Initialize states for new cells
-        for cell in cells:
-            if cell.id not in self.cell_states:
-                self.cell_states[cell.id] = CellState(cell_id=cell.id)
-
-        # Remove states for deleted cells
-        cell_ids = {c.id for c in cells}
-        to_remove = [cid for cid in self.cell_states if cid not in cell_ids]
-        for cid in to_remove:
-            del self.cell_states[cid]
+        with self._run_lock:
+            self.cells = cells
+            self._cells_by_id = {cell.id: cell for cell in cells}
+            self._fingerprint = None
+            # Initialize states for new cells
+            for cell in cells:
+                if cell.id not in self.cell_states:
+                    state = CellState(cell_id=cell.id)
+                    state._as_dict = _state_dict(state)
+                    self.cell_states[cell.id] = state
+
+            # Remove states for deleted cells
+            to_remove = [cid for cid in self.cell_states if cid not in self._cells_by_id]
+            for cid in to_remove:
+                del self.cell_states[cid]
+
+    def insert_cell(self, cell: Cell, after_id: Optional[str] = None):
+        """
+        Add a cell to the managed cells.
+
+        Waits for any run in progress, so a run never sees the cells change
+        under it.
+
+        Args:
+            cell: The new cell
+            after_id: Insert after this cell; "" inserts at the start, and
+                None or an unknown ID appends at the end
+        """
+        with self._run_lock:
+            if after_id == "":
+                self.cells.insert(0, cell)
+            else:
+                index = self._index_of(after_id) if after_id else None
+                if index is None:
+                    self.cells.append(cell)
+                else:
+                    self.cells.insert(index + 1, cell)
+            self.set_cells(self.cells)
+
+    def remove_cell(self, cell_id: str) -> Optional[frozenset[str]]:
+        """
+        Delete a managed cell along with the variables it defined.
+
+        Waits for any run in progress, so a run never sees the cell, its
+        state or its variables disappear under it.
+
+        Args:
+            cell_id: ID of the cell to delete
+
+        Returns:
+            Names of the variables the cell defined, or None if no managed
+            cell has that ID
+        """
+        with self._run_lock:
+            cell = self._cells_by_id.get(cell_id)
+            if cell is None or not remove_cell_by_id(self.cells, cell_id):
+                return None
+
+            variables = analyze_cell(cell).writes
+            namespace = self.executor.namespace
+            for name in variables:
+                namespace.pop(name, None)
+
+            self.clear_cell_state(cell_id)
+            invalidate_analysis(cell_id)
+            self.set_cells(self.cells)
+            return variables
+
+    def _index_of(self, cell_id: str) -> Optional[int]:
+        """Position of a managed cell, or None if there is no such cell."""
+        if isinstance(self.cells, CellRegistry):
+            return self.cells.index_of(cell_id)
+        for index, cell in enumerate(self.cells):
+            if cell.id == cell_id:
+                return index
+        return None
+
+    def update_cell(
+        self,
+        cell_id: str,
+        code: Optional[str] = None,
+        cell_type: Optional[str] = None,
+        as_var: Optional[str] = None,
+    ) -> Optional[Cell]:
+        """
+        Edit one managed cell in place.
+
+        Unlike set_cells, this doesn't re-index every cell or walk the cell
+        states; the next run sees the edit through the notebook fingerprint,
+        and the dependency index only re-analyzes the edited cell. Waits for
+        any run in progress.
+
+        Args:
+            cell_id: ID of the cell to edit
+            code: New source, if changed
+            cell_type: New cell type, if changed
+            as_var: New SQL result variable, if changed
+
+        Returns:
+            The edited cell, or None if no managed cell has that ID
+        """
+        with self._run_lock:
+            cell = self._cells_by_id.get(cell_id)
+            if cell is None:
+                return None
+            if code is not None:
+                cell.code = code
+            if cell_type is not None:
+                cell.cell_type = sys.intern(cell_type)
+            if as_var is not None:
+                cell.as_var = sys.intern(as_var)
+            return cell
 
     def clear_cell_state(self, cell_id: str):
         """Clear state for a specific cell."""
-        if cell_id in self.cell_states:
-            del self.cell_states[cell_id]
+        with self._run_lock:
+            if cell_id in self.cell_states:
+                del self.cell_states[cell_id]
+            self.executor.forget_cell(cell_id)
 
     def set_status_callback(self, callback: StatusCallback):
         """Set callback for status updates (used for WebSocket notifications)."""
@@ -89,8 +226,57 @@ class Reactor:
             for key, value in kwargs.items():
                 if hasattr(state, key):
                     setattr(state, key, value)
+            # Publish a fresh dict rather than invalidating, so readers on
+            # other threads never cache a half-updated state
+            state._as_dict = _state_dict(state)
             self._notify_status(cell_id, state)
 
+    def _refresh_graph_cache(self):
+        """Drop the memoized graph and orders if any cell changed since last run."""
+        # Cells are edited in place, so the fingerprint is rechecked on every run.
+        # String hashes are cached by CPython, so this is cheap for unchanged code.
+        fingerprint = hash(tuple(
+            (c.id, c.cell_type, c.as_var, c.code) for c in self.cells
+        ))
+        if fingerprint != self._fingerprint:
+            self._fingerprint = fingerprint
+            self._graph_cache = None
+            self._order_cache.clear()
+            self._group_order_cache.clear()
+
+    def _get_graph(self) -> dict[str, set[str]]:
+        """Get the (memoized) dependency graph for the current cells."""
+        with self._cache_lock:
+            self._refresh_graph_cache()
+            return self._graph_cache_or_build()
+
+    def _graph_cache_or_build(self) -> dict[str, set[str]]:
+        """Build the graph if it isn't cached; the caller holds the cache lock."""
+        if self._graph_cache is None:
+            self._graph_cache = build_dependency_graph(self.cells, self._dependency_index)
+        return self._graph_cache
+
+    def _get_execution_order(self, cell_id: str) -> tuple[list[str], Optional[list[str]]]:
+        """Get the (memoized) execution order starting from a cell."""
+        with self._cache_lock:
+            self._refresh_graph_cache()
+            cached = self._order_cache.get(cell_id)
+            if cached is None:
+                cached = get_execution_order(self.cells, cell_id, self._dependency_index)
+                self._order_cache[cell_id] = cached
+            return cached
+
+    def _get_group_order(self, group: list[str]) -> tuple[list[str], list[list[str]], list[str]]:
+        """Get the (memoized) single-pass order for an independent group."""
+        with self._cache_lock:
+            self._refresh_graph_cache()
+            key = tuple(group)
+            cached = self._group_order_cache.get(key)
+            if cached is None:
+                cached = get_full_execution_order(self._graph_cache_or_build(), set(group))
+                self._group_order_cache[key] = cached
+            return cached
+
     def run_cell(self, cell_id: str, sql_executor: Optional[Callable] = None) -> list[CellState]:
         """
         Run a cell and all its downstream dependents.
@@ -102,25 +288,46 @@ class Reactor:
         Returns:
             List of CellState objects for all executed cells
         """
+        with self._run_lock:
+            return self._run_cell(cell_id, sql_executor)
+
+    def _run_cell(self, cell_id: str, sql_executor: Optional[Callable]) -> list[CellState]:
+        """Run a cell and its dependents under an already-held run lock."""
         # Get execution order
-        order, cycle = get_execution_order(self.cells, cell_id)
+        order, cycle = self._get_execution_order(cell_id)
 
         if cycle:
             # Circular dependency detected
-            for cid in cycle:
-                self._update_status(
-                    cid,
-                    status=CellStatus.ERROR,
-                    error=f"Circular dependency detected: {' -> '.join(cycle)}",
-                )
-            return [self.cell_states[cid] for cid in cycle]
+            return self._report_cycle(cycle)
+
+        return self._execute_order(order, self._get_graph(), sql_executor, set())
+
+    def _report_cycle(self, cycle: list[str]) -> list[CellState]:
+        """Mark every cell on a cycle as failed."""
+        for cid in cycle:
+            self._update_status(
+                cid,
+                status=CellStatus.ERROR,
+                error=f"Circular dependency detected: {' -> '.join(cycle)}",
+            )
+        return [self.cell_states[cid] for cid in cycle]
+
+    def _execute_order(
+        self,
+        order: list[str],
+        graph: dict[str, set[str]],
+        sql_executor: Optional[Callable],
+        failed_cells: set[str],
+    ) -> list[CellState]:
+        """
+        Execute cells in order, blocking those with a failed upstream cell.
 
+        failed_cells is updated in place as cells fail or are blocked.
+        """
         results = []
-        failed_cells: set[str] = set()
-        graph = build_dependency_graph(self.cells)
 
         for cid in order:
-            cell = find_cell_by_id(self.cells, cid)
+            cell = self._cells_by_id.get(cid)
             if not cell:
                 continue
 
@@ -192,37 +399,61 @@ class Reactor:
         """
         Run all cells in dependency order.
 
+        Cells are split into independent groups. When more than one group
+        has SQL cells to run, groups are dispatched to a thread pool so their
+        queries overlap; Python cells still serialize on the executor.
+
         Args:
             sql_executor: Optional callback for executing SQL cells
 
         Returns:
             List of CellState objects for all cells
         """
-        if not self.cells:
-            return []
-
-        # Start from cells with no dependencies
-        graph = build_dependency_graph(self.cells)
-
-        # Find root cells (no dependencies)
-        root_cells = [c.id for c in self.cells if not graph.get(c.id)]
+        with self._run_lock:
+            if not self.cells:
+                return []
+
+            graph = self._get_graph()
+            groups = find_independent_groups(self.cells, graph)
+
+            sql_groups = sum(
+                1 for group in groups
+                if any(self._cells_by_id[cid].cell_type == "sql" for cid in group)
+            )
+            if sql_executor is None or sql_groups < 2:
+                return [
+                    state
+                    for group in groups
+                    for state in self._run_group(group, graph, sql_executor)
+                ]
+
+            workers = min(len(groups), MAX_PARALLEL_GROUPS)
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                batches = list(pool.map(
+                    lambda group: self._run_group(group, graph, sql_executor),
+                    groups,
+                ))
+            return [state for batch in batches for state in batch]
+
+    def _run_group(
+        self,
+        group: list[str],
+        graph: dict[str, set[str]],
+        sql_executor: Optional[Callable],
+    ) -> list[CellState]:
+        """Run one independent group in a single topological pass."""
+        order, cycles, blocked = self._get_group_order(group)
 
-        if not root_cells:
-            # All cells have dependencies - just start with the first one
-            root_cells = [self.cells[0].id]
-
-        all_results = []
-        executed = set()
+        failed_cells: set[str] = set()
+        results = self._execute_order(order, graph, sql_executor, failed_cells)
 
-        for root_id in root_cells:
-            if root_id not in executed:
-                results = self.run_cell(root_id, sql_executor)
-                for r in results:
-                    if r.cell_id not in executed:
-                        all_results.append(r)
-                        executed.add(r.cell_id)
+        for cycle in cycles:
+            results.extend(self._report_cycle(cycle))
+            failed_cells.update(cycle)
 
-        return all_results
+        # Everything behind a cycle is reported as blocked
+        results.extend(self._execute_order(blocked, graph, sql_executor, failed_cells))
+        return results
 
     def get_cell_state(self, cell_id: str) -> Optional[CellState]:
         """Get the current state of a cell."""
@@ -234,18 +465,37 @@ class Reactor:
 
     def reset(self):
         """Reset all cell states and the executor namespace."""
-        self.executor.reset_namespace()
-        for state in self.cell_states.values():
-            state.status = CellStatus.IDLE
-            state.output = None
-            state.stdout = ""
-            state.error = None
-            state.error_traceback = None
-            state.blocked_by = None
+        with self._run_lock:
+            self.executor.reset_namespace()
+            for state in self.cell_states.values():
+                # IDLE is only ever set here and on creation, so these
+                # states already hold the defaults
+                if state.status is CellStatus.IDLE:
+                    continue
+                state.status = CellStatus.IDLE
+                state.output = None
+                state.stdout = ""
+                state.error = None
+                state.error_traceback = None
+                state.blocked_by = None
+                state._as_dict = _state_dict(state)
 
 
 def cell_state_to_dict(state: CellState) -> dict:
-    """Convert CellState to dictionary for JSON serialization."""
+    """
+    Convert CellState to dictionary for JSON serialization.
+
+    Returns the dict published with the state's last change when there is
+    one, so unchanged states cost nothing to serialize; a state changed
+    outside the Reactor is serialized afresh. The result is shared and
+    must not be mutated.
+    """
+    cached = state._as_dict
+    return cached if cached is not None else _state_dict(state)
+
+
+def _state_dict(state: CellState) -> dict:
+    """Build the serialized form of a CellState."""
     return {
         "cell_id": state.cell_id,
         "status": state.status.value,
@@ -0,0 +1,39 @@
+"""
+Unit tests for the Database module.
+"""
+
+import pytest
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import is_read_only_select
+
+
+class TestIsReadOnlySelect:
+    """Tests for is_read_only_select."""
+
+    @pytest.mark.parametrize("query", [
+        "SELECT * FROM users",
+        "  select id from users;",
+        "WITH t AS (SELECT 1) SELECT * FROM t",
+        "SELECT 'INSERT INTO x' AS note",
+        "SELECT * FROM users -- FOR UPDATE",
+    ])
+    def test_read_only(self, query):
+        assert is_read_only_select(query) is True
+
+    @pytest.mark.parametrize("query", [
+        "INSERT INTO users VALUES (1)",
+        "SELECT * INTO backup FROM users",
+        "WITH d AS (DELETE FROM users RETURNING *) SELECT * FROM d",
+        "SELECT 1; SELECT 2",
+        "SELECT * FROM users FOR UPDATE",
+        "SELECT * FROM users FOR NO KEY UPDATE",
+        "SELECT * FROM users FOR SHARE",
+        "SELECT * FROM users for key share",
+    ])
+    def test_not_read_only(self, query):
+        assert is_read_only_select(query) is False
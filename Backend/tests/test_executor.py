@@ -2,6 +2,7 @@
 Unit tests for the Execution Engine module.
 """
 
+import base64
 import pytest
 import sys
 import os
@@ -9,6 +10,7 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from parser import Cell
+import executor as executor_module
 from executor import Executor, ExecutionResult, format_output
 
 
@@ -56,6 +58,38 @@ class TestExecutor:
         # _result should be removed from namespace after capture
         assert "_result" not in executor.namespace
 
+    def test_expression_cell_is_not_displayed(self, executor):
+        executor.execute_cell(Cell(id="c1", code="x = 20", cell_type="python"))
+        result = executor.execute_cell(Cell(id="c2", code="x + 1", cell_type="python"))
+        assert result.success is True
+        assert result.result is None
+        assert result.stdout == ""
+
+    def test_expression_cell_captures_property_output(self, executor):
+        setup = (
+            "class P:\n"
+            "    @property\n"
+            "    def v(self):\n"
+            "        print('from property')\n"
+            "        return 1\n"
+            "p = P()"
+        )
+        executor.execute_cell(Cell(id="c1", code=setup, cell_type="python"))
+        result = executor.execute_cell(Cell(id="c2", code="p.v", cell_type="python"))
+        assert result.success is True
+        assert result.stdout == "from property\n"
+
+    def test_expression_cell_with_call_captures_stdout(self, executor):
+        result = executor.execute_cell(Cell(id="c1", code='print("hi")', cell_type="python"))
+        assert result.success is True
+        assert result.result is None
+        assert "hi" in result.stdout
+
+    def test_expression_cell_error(self, executor):
+        result = executor.execute_cell(Cell(id="c1", code="missing_name", cell_type="python"))
+        assert result.success is False
+        assert "missing_name" in result.error
+
     def test_execute_handles_error(self, executor):
         cell = Cell(id="c1", code="x = 1/0", cell_type="python")
         result = executor.execute_cell(cell)
@@ -63,6 +97,16 @@ class TestExecutor:
         assert result.error is not None
         assert "division by zero" in result.error.lower()
 
+    def test_failed_cell_rolls_back_its_writes(self, executor):
+        executor.execute_cell(Cell(id="c1", code="x = 1", cell_type="python"))
+
+        cell = Cell(id="c1", code="x = 2\nnew_var = 3\ny = 1/0", cell_type="python")
+        result = executor.execute_cell(cell)
+
+        assert result.success is False
+        assert executor.get_variable("x") == 1
+        assert "new_var" not in executor.namespace
+
     def test_execute_handles_name_error(self, executor):
         cell = Cell(id="c1", code="print(undefined_variable)", cell_type="python")
         result = executor.execute_cell(cell)
@@ -100,6 +144,51 @@ class TestExecutor:
         executor.reset_namespace()
         assert executor.get_variable("x") is None
 
+    def test_unchanged_code_reuses_compiled_code(self, executor):
+        cell = Cell(id="c1", code="x = 1", cell_type="python")
+        executor.execute_cell(cell)
+        code_obj = executor._code_cache["c1"][1]
+
+        executor.execute_cell(cell)
+        assert executor._code_cache["c1"][1] is code_obj
+
+        cell.code = "x = 2"
+        executor.execute_cell(cell)
+        assert executor._code_cache["c1"][1] is not code_obj
+        assert executor.get_variable("x") == 2
+
+    def test_reset_keeps_compiled_code(self, executor):
+        cell = Cell(id="c1", code="x = 1", cell_type="python")
+        executor.execute_cell(cell)
+        code_obj = executor._code_cache["c1"][1]
+
+        executor.reset_namespace()
+        executor.execute_cell(cell)
+        assert executor._code_cache["c1"][1] is code_obj
+        assert executor.get_variable("x") == 1
+
+    def test_forget_cell_drops_compiled_code(self, executor):
+        executor.execute_cell(Cell(id="c1", code="x = 1", cell_type="python"))
+        executor.forget_cell("c1")
+        assert "c1" not in executor._code_cache
+
+    def test_traceback_names_cell(self, executor):
+        cell = Cell(id="c1", code="x = 1/0", cell_type="python")
+        result = executor.execute_cell(cell)
+        assert "<cell c1>" in result.error_traceback
+        assert "_execute_python_cell" not in result.error_traceback
+
+    def test_traceback_keeps_innermost_frames(self, executor):
+        cell = Cell(id="c1", code="def f(n):\n    return 1 / n if n == 0 else f(n - 1)\nf(50)", cell_type="python")
+        result = executor.execute_cell(cell)
+        assert result.error_traceback.count("<cell c1>") <= executor_module.TRACEBACK_LIMIT
+        assert "ZeroDivisionError" in result.error_traceback
+
+    def test_syntax_error_traceback(self, executor):
+        result = executor.execute_cell(Cell(id="c1", code="def broken(", cell_type="python"))
+        assert "SyntaxError" in result.error_traceback
+        assert "executor.py" not in result.error_traceback
+
     def test_set_variable(self, executor):
         executor.set_variable("test_var", [1, 2, 3])
         assert executor.get_variable("test_var") == [1, 2, 3]
@@ -121,6 +210,28 @@ class TestExecutor:
         assert executor.get_variable("b") == 2
         assert executor.get_variable("c") == 3
 
+    def test_comprehension_sees_cell_variables(self, executor):
+        # Cell code runs with the shared namespace as globals, so nested
+        # scopes can see names defined earlier in the same cell
+        cell = Cell(id="c1", code="n = 3\nvals = [i * n for i in range(3)]", cell_type="python")
+        result = executor.execute_cell(cell)
+        assert result.success is True
+        assert executor.get_variable("vals") == [0, 3, 6]
+
+    def test_concurrent_results_do_not_mix(self, executor):
+        from concurrent.futures import ThreadPoolExecutor
+
+        cells = [
+            Cell(id=f"c{i}", code=f"print({i})\n_result = {i}", cell_type="python")
+            for i in range(20)
+        ]
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(executor.execute_cell, cells))
+
+        for i, result in enumerate(results):
+            assert result.result == str(i)
+            assert result.stdout == f"{i}\n"
+
     def test_execute_with_imports(self, executor):
         cell = Cell(id="c1", code="import math\nx = math.sqrt(16)", cell_type="python")
         result = executor.execute_cell(cell)
@@ -151,6 +262,133 @@ class TestExecutor:
         assert executor.get_variable("result") == 2
 
 
+class TestResultCache:
+    """Tests for replaying pure cells from the result cache."""
+
+    @pytest.fixture
+    def executor(self):
+        return Executor()
+
+    def test_unchanged_inputs_replay_result(self, executor):
+        executor.set_variable("x", 3)
+        cell = Cell(id="c1", code="y = x * 2\nprint(x)", cell_type="python")
+
+        first = executor.execute_cell(cell)
+        second = executor.execute_cell(cell)
+
+        assert second is first
+        assert second.stdout == "3\n"
+        assert executor.get_variable("y") == 6
+
+    def test_cell_reading_own_output_replays_once_stable(self, executor):
+        cell = Cell(id="c1", code="x = 1\ny = x + 1", cell_type="python")
+
+        first = executor.execute_cell(cell)
+        second = executor.execute_cell(cell)
+        third = executor.execute_cell(cell)
+
+        # x existed before the second run but not the first, so only the
+        # third run sees the same inputs again
+        assert second is not first
+        assert third is second
+
+    def test_changed_input_reexecutes(self, executor):
+        executor.set_variable("x", 3)
+        cell = Cell(id="c1", code="y = x * 2", cell_type="python")
+        first = executor.execute_cell(cell)
+
+        executor.set_variable("x", 4)
+        second = executor.execute_cell(cell)
+
+        assert second is not first
+        assert executor.get_variable("y") == 8
+
+    def test_self_update_is_not_replayed(self, executor):
+        executor.set_variable("x", 1)
+        executor.set_variable("n", 1)
+        cell = Cell(id="c1", code="x = x + 1\nn += 1", cell_type="python")
+
+        executor.execute_cell(cell)
+        executor.execute_cell(cell)
+
+        assert executor.get_variable("x") == 3
+        assert executor.get_variable("n") == 3
+
+    def test_mutated_output_reexecutes(self, executor):
+        executor.set_variable("x", 3)
+        cell = Cell(id="c1", code="y = [x]", cell_type="python")
+        executor.execute_cell(cell)
+
+        executor.get_variable("y").append(5)
+        executor.execute_cell(cell)
+
+        assert executor.get_variable("y") == [3]
+
+    def test_deleted_output_reexecutes(self, executor):
+        cell = Cell(id="c1", code="y = 1", cell_type="python")
+        executor.execute_cell(cell)
+
+        del executor.namespace["y"]
+        executor.execute_cell(cell)
+
+        assert executor.get_variable("y") == 1
+
+    def test_impure_cells_not_cached(self, executor):
+        executor.set_variable("items", [])
+        cells = [
+            Cell(id="call", code="n = (5).bit_length()", cell_type="python"),
+            Cell(id="mutate", code="items.append(1)", cell_type="python"),
+            Cell(id="store", code="d = {}\nd['k'] = 1", cell_type="python"),
+            Cell(id="imp", code="import math", cell_type="python"),
+        ]
+        for cell in cells:
+            assert executor.execute_cell(cell).success
+
+        executor.execute_cell(cells[1])
+
+        assert executor.get_variable("items") == [1, 1]
+        assert not executor._result_cache
+
+    def test_unpicklable_input_not_cached(self, executor):
+        executor.set_variable("gen", (i for i in range(3)))
+        cell = Cell(id="c1", code="g = gen", cell_type="python")
+        executor.execute_cell(cell)
+        assert "c1" not in executor._result_cache
+
+    def test_large_or_mutable_values_not_cached(self, executor):
+        import pandas as pd
+        executor.set_variable("df", pd.DataFrame({"a": [1, 2]}))
+        executor.set_variable("s", "x" * 10_000)
+        cells = [
+            Cell(id="frame", code="n = df", cell_type="python"),
+            Cell(id="text", code="t = s", cell_type="python"),
+            Cell(id="out", code="y = [1]", cell_type="python"),
+        ]
+        for cell in cells:
+            assert executor.execute_cell(cell).success
+
+        assert not executor._result_cache
+
+    def test_equal_values_of_other_types_reexecute(self, executor):
+        executor.set_variable("x", 1)
+        cell = Cell(id="c1", code="y = x", cell_type="python")
+        first = executor.execute_cell(cell)
+
+        executor.set_variable("x", 1.0)
+        second = executor.execute_cell(cell)
+
+        assert second is not first
+        assert type(executor.get_variable("y")) is float
+
+    def test_reset_clears_cache(self, executor):
+        cell = Cell(id="c1", code="y = 1", cell_type="python")
+        executor.execute_cell(cell)
+        assert "c1" in executor._result_cache
+
+        executor.reset_namespace()
+        assert not executor._result_cache
+
+
 class TestExecutionResult:
     """Tests for ExecutionResult dataclass."""
 
@@ -216,7 +454,9 @@ class TestDataFrameRendering:
     def executor(self):
         return Executor()
 
-    def test_dataframe_result_renders_html(self, executor):
+    def test_dataframe_result_renders_html(self, executor, monkeypatch):
+        # Without pyarrow, DataFrames fall back to HTML
+        monkeypatch.setattr(executor_module, "pa", None)
         cell = Cell(id="c1", code="""import pandas as pd
 df = pd.DataFrame({'a': [1, 2], 'b': [3, 4]})
 _result = df""", cell_type="python")
@@ -226,3 +466,89 @@ _result = df""", cell_type="python")
         assert result.result_type == "html"
         assert "<table" in result.result
         assert "dataframe" in result.result
+
+    def test_dataframe_result_renders_arrow(self, executor):
+        pa = pytest.importorskip("pyarrow")
+        cell = Cell(id="c1", code="""import pandas as pd
+_result = pd.DataFrame({'a': range(120)})""", cell_type="python")
+        result = executor.execute_cell(cell)
+
+        assert result.success is True
+        assert result.result_type == "arrow"
+        table = pa.ipc.open_stream(base64.b64decode(result.result)).read_all()
+        assert table.num_rows == 50
+        assert table.schema.metadata[b"total_rows"] == b"120"
+
+    def test_wide_dataframe_html_preview_caps_columns(self, executor, monkeypatch):
+        pd = pytest.importorskip("pandas")
+        monkeypatch.setattr(executor_module, "pa", None)
+        df = pd.DataFrame({f"c{i}": range(60) for i in range(45)})
+        result, result_type = executor.render_value(df)
+
+        assert result_type == "html"
+        assert "c39" in result
+        assert "c40" not in result
+        assert "Showing 50 of 60 rows, 40 of 45 columns" in result
+
+    def test_wide_dataframe_arrow_preview_records_totals(self, executor):
+        pd = pytest.importorskip("pandas")
+        pa = pytest.importorskip("pyarrow")
+        df = pd.DataFrame({f"c{i}": range(3) for i in range(45)})
+        result, result_type = executor.render_value(df)
+
+        assert result_type == "arrow"
+        table = pa.ipc.open_stream(base64.b64decode(result)).read_all()
+        assert table.num_rows == 3
+        assert table.schema.metadata[b"total_columns"] == b"45"
+
+
+class TestFigureRendering:
+    """Tests for figure rendering (any object with savefig)."""
+
+    class FakeFigure:
+        def __init__(self, data: bytes):
+            self.data = data
+
+        def savefig(self, buf, **kwargs):
+            buf.write(self.data)
+
+    def test_figure_renders_png_img(self):
+        executor = Executor()
+        html, result_type = executor._render_result(self.FakeFigure(b"png-bytes"))
+        assert result_type == "html"
+        assert html == '<img src="data:image/png;base64,cG5nLWJ5dGVz" />'
+
+    def test_buffer_reused_between_figures(self):
+        executor = Executor()
+        executor._render_result(self.FakeFigure(b"a much longer first image"))
+        html, _ = executor._render_result(self.FakeFigure(b"png-bytes"))
+        assert html == '<img src="data:image/png;base64,cG5nLWJ5dGVz" />'
+
+
+class TestRichHtmlRendering:
+    """Tests for objects rendered through _repr_html_."""
+
+    class Rich:
+        def _repr_html_(self):
+            return "<b>rich</b>"
+
+    class BrokenRich:
+        def _repr_html_(self):
+            raise ValueError("no html")
+
+        def __repr__(self):
+            return "BrokenRich()"
+
+    def test_repr_html_renders_html(self):
+        html, result_type = Executor()._render_result(self.Rich())
+        assert result_type == "html"
+        assert html == "<b>rich</b>"
+
+    def test_failing_repr_html_falls_back_to_repr(self):
+        text, result_type = Executor()._render_result(self.BrokenRich())
+        assert result_type == "text"
+        assert text == "BrokenRich()"
+
+    def test_class_with_repr_html_renders_as_text(self):
+        _, result_type = Executor()._render_result(self.Rich)
+        assert result_type == "text"
@@ -18,6 +18,7 @@ from parser import (
     create_cell,
     find_cell_by_id,
     remove_cell_by_id,
+    CellRegistry,
 )
 
 
@@ -40,6 +41,10 @@ class TestParseMarker:
         result = parse_marker("id:  abc123 ,  type:  python")
         assert result == {"id": "abc123", "type": "python"}
 
+    def test_parse_skips_parts_without_colon(self):
+        result = parse_marker("id: abc123, stray, as: a:b")
+        assert result == {"id": "abc123", "as": "a:b"}
+
 
 class TestParseNotebook:
     """Tests for parse_notebook function."""
@@ -96,6 +101,37 @@ print(df.head())"""
         assert cells[1].cell_type == "sql"
         assert cells[2].cell_type == "python"
 
+    def test_parse_ignores_content_before_first_marker(self):
+        content = """import os
+
+# %% [id: cell1]
+x = 1"""
+        cells = parse_notebook(content)
+        assert len(cells) == 1
+        assert cells[0].code == "x = 1"
+
+    def test_parse_marker_does_not_span_lines(self):
+        content = """# %% [id: cell1]
+x = 1
+# %%
+[id: cell2]
+y = 2"""
+        cells = parse_notebook(content)
+        assert len(cells) == 1
+        assert cells[0].code == "x = 1\n# %%\n[id: cell2]\ny = 2"
+
+    def test_parse_crlf_markers(self):
+        content = "# %% [id: cell1]\r\nx = 1\r\n# %% [id: cell2]\r\ny = 2"
+        cells = parse_notebook(content)
+        assert [c.id for c in cells] == ["cell1", "cell2"]
+        assert cells[0].code == "x = 1"
+
+    def test_parse_generates_missing_id(self):
+        cells = parse_notebook("# %% [type: sql]\nSELECT 1")
+        assert len(cells) == 1
+        assert len(cells[0].id) == 8
+        assert cells[0].cell_type == "sql"
+
     def test_parse_preserves_code_formatting(self):
         content = """# %% [id: cell1]
 def hello():
@@ -218,3 +254,48 @@ class TestCellDataclass:
         assert cell.code == "x = 1"
         assert cell.cell_type == "sql"
         assert cell.as_var == "df"
+
+    def test_cell_is_slotted(self):
+        cell = Cell(id="abc", code="x = 1")
+        assert not hasattr(cell, "__dict__")
+        with pytest.raises(AttributeError):
+            cell.extra = 1
+
+
+class TestCellRegistry:
+    """Tests for CellRegistry."""
+
+    def _registry(self):
+        return CellRegistry([
+            Cell(id="a", code="1"),
+            Cell(id="b", code="2"),
+            Cell(id="c", code="3"),
+        ])
+
+    def test_behaves_like_list(self):
+        registry = self._registry()
+        assert len(registry) == 3
+        assert [c.id for c in registry] == ["a", "b", "c"]
+        assert registry[0].id == "a"
+
+    def test_lookup_by_id(self):
+        registry = self._registry()
+        assert registry.get("b").code == "2"
+        assert find_cell_by_id(registry, "c").code == "3"
+        assert find_cell_by_id(registry, "missing") is None
+        assert "a" in registry
+
+    def test_insert_and_append_update_index(self):
+        registry = self._registry()
+        registry.insert(registry.index_of("a") + 1, Cell(id="x", code=""))
+        registry.append(Cell(id="y", code=""))
+        assert [c.id for c in registry] == ["a", "x", "b", "c", "y"]
+        assert registry.get("x") is not None
+        assert registry.index_of("y") == 4
+
+    def test_remove(self):
+        registry = self._registry()
+        assert remove_cell_by_id(registry, "b") is True
+        assert remove_cell_by_id(registry, "b") is False
+        assert registry.get("b") is None
+        assert [c.id for c in registry] == ["a", "c"]
@@ -5,11 +5,13 @@ Unit tests for the Reactive Runner module.
 import pytest
 import sys
 import os
+import threading
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from parser import Cell
 from reactor import Reactor, CellStatus, CellState, cell_state_to_dict
+from executor import ExecutionResult
 
 
 class TestReactor:
@@ -101,6 +103,28 @@ class TestReactor:
         assert results[1].status == CellStatus.BLOCKED
         assert results[2].status == CellStatus.BLOCKED
 
+    def test_run_unknown_cell_runs_nothing(self, reactor):
+        reactor.set_cells([Cell(id="c1", code="x = 10", cell_type="python")])
+
+        assert reactor.run_cell("missing") == []
+        assert reactor.cell_states["c1"].status == CellStatus.IDLE
+
+    def test_update_cell_edits_in_place(self, reactor):
+        cells = [
+            Cell(id="c1", code="x = 1", cell_type="python"),
+            Cell(id="c2", code="y = x + 1", cell_type="python"),
+        ]
+        reactor.set_cells(cells)
+        reactor.run_cell("c1")
+
+        cell = reactor.update_cell("c1", code="x = 5")
+
+        assert cell is cells[0]
+        assert cell.code == "x = 5"
+        assert reactor.update_cell("missing", code="z = 0") is None
+        reactor.run_cell("c1")
+        assert reactor.executor.get_variable("y") == 6
+
     def test_run_all_cells(self, reactor):
         cells = [
             Cell(id="c1", code="x = 10", cell_type="python"),
@@ -182,6 +206,217 @@ class TestReactor:
         assert "c1" in reactor.cell_states
         assert "c2" not in reactor.cell_states
 
+    def test_insert_cell_positions(self, reactor):
+        reactor.set_cells([Cell(id="a", code=""), Cell(id="b", code="")])
+
+        reactor.insert_cell(Cell(id="first", code=""), "")
+        reactor.insert_cell(Cell(id="mid", code=""), "a")
+        reactor.insert_cell(Cell(id="last", code=""), None)
+        reactor.insert_cell(Cell(id="orphan", code=""), "missing")
+
+        assert [c.id for c in reactor.cells] == ["first", "a", "mid", "b", "last", "orphan"]
+        assert "mid" in reactor.cell_states
+
+    def test_remove_cell_drops_state_and_variables(self, reactor):
+        cells = [
+            Cell(id="c1", code="x = 10", cell_type="python"),
+            Cell(id="c2", code="y = 20", cell_type="python"),
+        ]
+        reactor.set_cells(cells)
+        reactor.run_all_cells()
+
+        removed = reactor.remove_cell("c1")
+
+        assert removed == {"x"}
+        assert [c.id for c in reactor.cells] == ["c2"]
+        assert "c1" not in reactor.cell_states
+        assert reactor.executor.get_variable("x") is None
+        assert reactor.executor.get_variable("y") == 20
+        assert reactor.remove_cell("c1") is None
+
+    def test_remove_cell_waits_for_running_cells(self, reactor):
+        cells = [
+            Cell(id="c1", code="x = 1", cell_type="python"),
+            Cell(id="c2", code="y = x + 1", cell_type="python"),
+        ]
+        reactor.set_cells(cells)
+        started = threading.Event()
+        release = threading.Event()
+        original = reactor.executor.execute_cell
+
+        def paused_execute(cell):
+            if cell.id == "c1":
+                started.set()
+                release.wait(5)
+            return original(cell)
+
+        reactor.executor.execute_cell = paused_execute
+        results = []
+        run = threading.Thread(target=lambda: results.extend(reactor.run_cell("c1")))
+        run.start()
+        started.wait(5)
+
+        remover = threading.Thread(target=reactor.remove_cell, args=("c2",))
+        remover.start()
+        remover.join(0.05)
+        # The delete can't land while the run still holds the cells
+        assert remover.is_alive()
+        assert "c2" in reactor.cell_states
+
+        release.set()
+        run.join(5)
+        remover.join(5)
+
+        assert [r.cell_id for r in results] == ["c1", "c2"]
+        assert "c2" not in reactor.cell_states
+
+
+class TestGraphMemoization:
+    """Tests for the reactor's memoized dependency graph and orders."""
+
+    @pytest.fixture
+    def reactor(self):
+        return Reactor()
+
+    def test_graph_reused_when_cells_unchanged(self, reactor):
+        cells = [
+            Cell(id="c1", code="x = 10", cell_type="python"),
+            Cell(id="c2", code="y = x + 5", cell_type="python"),
+        ]
+        reactor.set_cells(cells)
+
+        reactor.run_cell("c1")
+        graph = reactor._graph_cache
+        reactor.run_cell("c1")
+
+        assert reactor._graph_cache is graph
+        assert "c1" in reactor._order_cache
+
+    def test_in_place_code_edit_invalidates(self, reactor):
+        cells = [
+            Cell(id="c1", code="x = 10", cell_type="python"),
+            Cell(id="c2", code="y = 1", cell_type="python"),
+        ]
+        reactor.set_cells(cells)
+        results = reactor.run_cell("c1")
+        assert [r.cell_id for r in results] == ["c1"]
+
+        # Edit without calling set_cells: the fingerprint must catch it
+        cells[1].code = "y = x + 1"
+        results = reactor.run_cell("c1")
+
+        assert [r.cell_id for r in results] == ["c1", "c2"]
+        assert reactor.executor.get_variable("y") == 11
+
+    def test_as_var_change_invalidates(self, reactor):
+        cells = [
+            Cell(id="c1", code="SELECT 1", cell_type="sql", as_var="df"),
+            Cell(id="c2", code="n = len(rows)", cell_type="python"),
+        ]
+        reactor.set_cells(cells)
+        assert reactor._get_graph()["c2"] == set()
+
+        cells[0].as_var = "rows"
+
+        assert reactor._get_graph()["c2"] == {"c1"}
+
+
+class TestParallelGroups:
+    """Tests for running independent groups from run_all_cells."""
+
+    @pytest.fixture
+    def reactor(self):
+        return Reactor()
+
+    def test_independent_sql_groups_overlap(self, reactor):
+        cells = [
+            Cell(id="q1", code="SELECT 1", cell_type="sql", as_var="a"),
+            Cell(id="q2", code="SELECT 2", cell_type="sql", as_var="b"),
+            Cell(id="p1", code="a2 = a * 2", cell_type="python"),
+        ]
+        reactor.set_cells(cells)
+        threads = set()
+        # Both SQL cells must be in flight at once to get past the barrier;
+        # run one after the other, the first wait times out and breaks it
+        barrier = threading.Barrier(2, timeout=5)
+
+        def overlapping_sql(cell):
+            threads.add(threading.get_ident())
+            barrier.wait()
+            reactor.executor.inject_sql_result(cell.as_var, 1)
+            return ExecutionResult(cell_id=cell.id, success=True, result="ok")
+
+        results = reactor.run_all_cells(sql_executor=overlapping_sql)
+
+        assert [r.cell_id for r in results] == ["q1", "p1", "q2"]
+        assert all(r.status == CellStatus.SUCCESS for r in results)
+        assert reactor.executor.get_variable("a2") == 2
+        assert len(threads) == 2
+        assert not barrier.broken
+
+    def test_python_only_runs_sequentially(self, reactor):
+        cells = [
+            Cell(id="c1", code="x = 1", cell_type="python"),
+            Cell(id="c2", code="y = 2", cell_type="python"),
+        ]
+        reactor.set_cells(cells)
+
+        results = reactor.run_all_cells()
+
+        assert [r.cell_id for r in results] == ["c1", "c2"]
+
+    def test_shared_descendant_runs_once(self, reactor):
+        cells = [
+            Cell(id="c1", code="x = 1", cell_type="python"),
+            Cell(id="c2", code="y = 2", cell_type="python"),
+            Cell(id="c3", code="z = x + y", cell_type="python"),
+        ]
+        reactor.set_cells(cells)
+        executed = []
+        original = reactor.executor.execute_cell
+
+        def tracking_execute(cell):
+            executed.append(cell.id)
+            return original(cell)
+
+        reactor.executor.execute_cell = tracking_execute
+        results = reactor.run_all_cells()
+
+        assert executed == ["c1", "c2", "c3"]
+        assert [r.cell_id for r in results] == ["c1", "c2", "c3"]
+
+    def test_cycle_does_not_stop_rest_of_group(self, reactor):
+        cells = [
+            Cell(id="c1", code="x = 1", cell_type="python"),
+            Cell(id="c2", code="a = b + x", cell_type="python"),
+            Cell(id="c3", code="b = a", cell_type="python"),
+            Cell(id="c4", code="y = x * 2", cell_type="python"),
+            Cell(id="c5", code="z = a + y", cell_type="python"),
+        ]
+        reactor.set_cells(cells)
+
+        results = reactor.run_all_cells()
+
+        assert [r.cell_id for r in results] == ["c1", "c4", "c2", "c3", "c5"]
+        assert reactor.executor.get_variable("y") == 2
+        assert reactor.cell_states["c2"].status == CellStatus.ERROR
+        assert reactor.cell_states["c3"].status == CellStatus.ERROR
+        assert reactor.cell_states["c5"].status == CellStatus.BLOCKED
+
+    def test_isolated_cycle_is_reported(self, reactor):
+        cells = [
+            Cell(id="c1", code="x = 1", cell_type="python"),
+            Cell(id="c2", code="a = b", cell_type="python"),
+            Cell(id="c3", code="b = a", cell_type="python"),
+        ]
+        reactor.set_cells(cells)
+
+        reactor.run_all_cells()
+
+        assert reactor.cell_states["c1"].status == CellStatus.SUCCESS
+        assert reactor.cell_states["c2"].status == CellStatus.ERROR
+        assert "Circular dependency" in reactor.cell_states["c3"].error
+
 
 class TestCellState:
     """Tests for CellState dataclass."""
@@ -224,6 +459,12 @@ class TestCellState:
         assert state.status == CellStatus.BLOCKED
         assert state.blocked_by == "c1"
 
+    def test_state_is_slotted(self):
+        state = CellState(cell_id="c1")
+        assert not hasattr(state, "__dict__")
+        with pytest.raises(AttributeError):
+            state.extra = 1
+
 
 class TestCellStateToDict:
     """Tests for cell_state_to_dict function."""
@@ -257,6 +498,36 @@ class TestCellStateToDict:
         assert d["error"] == "Error message"
         assert d["error_traceback"] == "Traceback..."
 
+    def test_reactor_republishes_dict_on_change(self):
+        reactor = Reactor()
+        reactor.set_cells([Cell(id="c1", code="_result = 1")])
+        state = reactor.get_cell_state("c1")
+
+        idle = cell_state_to_dict(state)
+        assert idle["status"] == "idle"
+        assert cell_state_to_dict(state) is idle
+
+        reactor.run_cell("c1")
+        done = cell_state_to_dict(state)
+        assert done["status"] == "success"
+        assert done["output"] == "1"
+
+        reactor.reset()
+        assert cell_state_to_dict(state)["status"] == "idle"
+
+    def test_direct_assignment_invalidates_dict(self):
+        reactor = Reactor()
+        reactor.set_cells([Cell(id="c1", code="x = 1")])
+        state = reactor.get_cell_state("c1")
+        assert cell_state_to_dict(state)["status"] == "idle"
+
+        state.status = CellStatus.ERROR
+        assert cell_state_to_dict(state)["status"] == "error"
+
+    def test_dict_is_not_an_init_param(self):
+        with pytest.raises(TypeError):
+            CellState(cell_id="c1", _as_dict={})
+
 
 class TestCellStatus:
     """Tests for CellStatus enum."""
@@ -304,6 +575,24 @@ class TestReactiveExecution:
         assert reactor.executor.get_variable("tax") == 20
         assert reactor.executor.get_variable("total") == 220
 
+    def test_spreadsheet_like_updates_in_place(self, reactor):
+        """Test that an in-place edit of an upstream cell propagates."""
+        cells = [
+            Cell(id="c1", code="price = 100", cell_type="python"),
+            Cell(id="c2", code="tax_rate = 0.1", cell_type="python"),
+            Cell(id="c3", code="tax = price * tax_rate", cell_type="python"),
+            Cell(id="c4", code="total = price + tax", cell_type="python"),
+        ]
+        reactor.set_cells(cells)
+        reactor.run_all_cells()
+
+        # Change price without resending the notebook
+        reactor.update_cell("c1", code="price = 200")
+        reactor.run_cell("c1")
+
+        assert reactor.executor.get_variable("tax") == 20
+        assert reactor.executor.get_variable("total") == 220
+
     def test_independent_cells_not_affected(self, reactor):
         """Test that independent cells are not re-executed."""
         cells = [
@@ -12,6 +12,8 @@
 
 let cells = [];
 let cellStates = {};
+// Server version of the cells list; cell deltas must arrive in sequence
+let cellsVersion = 0;
 let ws = null;
 let currentCellId = null;
 // Track cells being edited and their pending server content
@@ -76,45 +78,40 @@ function handleWebSocketMessage(message) {
             // Initial state from server
             cells = message.data.cells;
             cellStates = message.data.states;
+            cellsVersion = message.data.version;
             updateDbStatus(message.data.db_connected);
             renderAllCells();
             break;
 
-        case 'status':
-            // Cell status update
-            const state = message.data;
-            cellStates[state.cell_id] = state;
-            updateCellUI(state.cell_id);
+        case 'status_batch':
+            // Coalesced status updates, latest state per cell
+            for (const batchedState of message.data) {
+                cellStates[batchedState.cell_id] = batchedState;
+                updateCellUI(batchedState.cell_id);
+            }
             break;
 
-        case 'cells_updated':
-            // Cells list changed
-            const newCells = message.data;
-            const structureChanged = newCells.length !== cells.length ||
-                newCells.some((c, i) => cells[i]?.id !== c.id);
+        case 'states_reset':
+            // Every cell went back to idle
+            for (const cell of cells) {
+                cellStates[cell.id] = idleCellState(cell.id);
+                updateCellUI(cell.id);
+            }
+            break;
 
-            // Update cells array
-            const oldCells = cells;
-            cells = newCells;
+        case 'cell_upserted':
+            // A single cell was created or edited
+            if (acceptCellsVersion(message.version)) {
+                applyCellUpsert(message.data, message.index);
+            }
+            break;
 
-            if (structureChanged) {
-                // Structure changed - full re-render
+        case 'cell_deleted':
+            // A single cell was removed
+            if (acceptCellsVersion(message.version)) {
+                cells = cells.filter(c => c.id !== message.id);
+                delete cellStates[message.id];
                 renderAllCells();
-            } else {
-                // Content changed - check each cell
-                for (const cell of cells) {
-                    const oldCell = oldCells.find(c => c.id === cell.id);
-                    if (oldCell && oldCell.code !== cell.code) {
-                        if (editingCells.has(cell.id)) {
-                            // User is editing this cell - mark as pending
-                            pendingUpdates[cell.id] = cell.code;
-                            showPendingIndicator(cell.id, true);
-                        } else {
-                            // Not editing - update directly
-                            updateCellContent(cell.id, cell.code);
-                        }
-                    }
-                }
             }
             break;
 
@@ -124,6 +121,89 @@ function handleWebSocketMessage(message) {
     }
 }
 
+function idleCellState(cellId) {
+    return {
+        cell_id: cellId,
+        status: 'idle',
+        output: null,
+        output_type: 'text',
+        stdout: '',
+        error: null,
+        error_traceback: null,
+        blocked_by: null,
+    };
+}
+
+function acceptCellsVersion(version) {
+    if (version !== cellsVersion + 1) {
+        // Missed a delta - fetch the full list instead
+        resyncCells();
+        return false;
+    }
+    cellsVersion = version;
+    return true;
+}
+
+async function resyncCells() {
+    try {
+        const data = await apiCall('/cells');
+        cellsVersion = data.version;
+        applyCellsList(data.cells);
+    } catch (error) {
+        console.error('Failed to resync cells:', error);
+    }
+}
+
+function applyCellsList(newCells) {
+    const structureChanged = newCells.length !== cells.length ||
+        newCells.some((c, i) => cells[i]?.id !== c.id);
+
+    // Update cells array
+    const oldCells = cells;
+    cells = newCells;
+
+    if (structureChanged) {
+        // Structure changed - full re-render
+        renderAllCells();
+    } else {
+        // Content changed - check each cell
+        for (const cell of cells) {
+            const oldCell = oldCells.find(c => c.id === cell.id);
+            if (oldCell && oldCell.code !== cell.code) {
+                applyServerCode(cell.id, cell.code);
+            }
+        }
+    }
+}
+
+function applyCellUpsert(cell, index) {
+    const existing = cells.findIndex(c => c.id === cell.id);
+
+    if (existing === -1) {
+        // New cell - insert and re-render
+        cells.splice(index, 0, cell);
+        renderAllCells();
+        return;
+    }
+
+    const oldCell = cells[existing];
+    cells[existing] = cell;
+    if (oldCell.code !== cell.code) {
+        applyServerCode(cell.id, cell.code);
+    }
+}
+
+function applyServerCode(cellId, code) {
+    if (editingCells.has(cellId)) {
+        // User is editing this cell - mark as pending
+        pendingUpdates[cellId] = code;
+        showPendingIndicator(cellId, true);
+    } else {
+        // Not editing - update directly
+        updateCellContent(cellId, code);
+    }
+}
+
 // === API Calls ===
 
 async function apiCall(endpoint, method = 'GET', body = null) {
@@ -581,6 +661,8 @@ function applyCellState(cellDiv, state) {
     if (state.output) {
         if (state.output_type === 'html') {
             resultDiv.innerHTML = state.output;
+        } else if (state.output_type === 'arrow') {
+            renderArrowTable(resultDiv, state.output);
         } else {
             resultDiv.textContent = state.output;
         }
@@ -617,6 +699,128 @@ function applyCellState(cellDiv, state) {
     }
 }
 
+function renderArrowTable(container, base64Data) {
+    // Decode a base64 Arrow IPC stream (DataFrame preview) into an HTML table
+    if (typeof Arrow === 'undefined') {
+        container.textContent = 'Unable to display table: Arrow library not loaded';
+        return;
+    }
+
+    const bytes = Uint8Array.from(atob(base64Data), c => c.charCodeAt(0));
+    const table = Arrow.tableFromIPC(bytes);
+    const metadata = table.schema.metadata;
+
+    // pandas stores its index as ordinary columns, listed in the metadata
+    const pandasMeta = metadata.has('pandas') ? JSON.parse(metadata.get('pandas')) : {};
+    const indexNames = (pandasMeta.index_columns || []).filter(c => typeof c === 'string');
+    const fieldNames = table.schema.fields.map(f => f.name);
+    const indexColumns = indexNames.map(name => table.getChild(name));
+    const dataNames = fieldNames.filter(name => !indexNames.includes(name));
+    const dataColumns = dataNames.map(name => table.getChild(name));
+
+    const indexFormats = indexColumns.map(col => arrowFormatter(col.type));
+    const dataFormats = dataColumns.map(col => arrowFormatter(col.type));
+
+    const tableEl = document.createElement('table');
+    tableEl.className = 'dataframe';
+
+    const headerRow = tableEl.createTHead().insertRow();
+    indexNames.forEach(() => headerRow.appendChild(document.createElement('th')));
+    dataNames.forEach(name => {
+        const th = document.createElement('th');
+        th.textContent = name;
+        headerRow.appendChild(th);
+    });
+
+    const tbody = tableEl.createTBody();
+    for (let i = 0; i < table.numRows; i++) {
+        const row = tbody.insertRow();
+        indexColumns.forEach((col, c) => {
+            const th = document.createElement('th');
+            th.textContent = indexFormats[c](col.get(i));
+            row.appendChild(th);
+        });
+        dataColumns.forEach((col, c) => {
+            row.insertCell().textContent = dataFormats[c](col.get(i));
+        });
+    }
+
+    container.appendChild(tableEl);
+
+    const totalRows = parseInt(metadata.get('total_rows') || table.numRows, 10);
+    const totalColumns = parseInt(metadata.get('total_columns') || dataNames.length, 10);
+    const truncated = [];
+    if (totalRows > table.numRows) {
+        truncated.push(`${table.numRows} of ${totalRows} rows`);
+    }
+    if (totalColumns > dataNames.length) {
+        truncated.push(`${dataNames.length} of ${totalColumns} columns`);
+    }
+    if (truncated.length) {
+        const note = document.createElement('p');
+        note.innerHTML = `<em>Showing ${truncated.join(', ')}</em>`;
+        container.appendChild(note);
+    }
+}
+
+function arrowFormatter(type) {
+    // Display Arrow values the way pandas' HTML table would; nulls are blank
+    const { DataType } = Arrow;
+    let format = String;
+    if (DataType.isTimestamp(type)) {
+        // Timestamps arrive as UTC epoch milliseconds
+        const suffix = type.timezone ? '+00:00' : '';
+        format = value => formatEpochMs(value, false) + suffix;
+    } else if (DataType.isDate(type)) {
+        format = value => formatEpochMs(value, true);
+    } else if (DataType.isDecimal(type)) {
+        // Decimals arrive as unscaled integers
+        format = value => scaleDecimal(String(value), type.scale);
+    } else if (DataType.isFloat(type)) {
+        format = formatFloat;
+    } else if (DataType.isBool(type)) {
+        format = value => (value ? 'True' : 'False');
+    }
+    return value => (value === null || value === undefined) ? '' : format(value);
+}
+
+function formatEpochMs(value, dateOnly) {
+    const ms = value instanceof Date ? value.getTime() : Number(value);
+    if (!Number.isFinite(ms) || Math.abs(ms) > 8.64e15) {
+        return String(value);
+    }
+    const iso = new Date(ms).toISOString();
+    if (dateOnly) {
+        return iso.slice(0, 10);
+    }
+    // 2024-01-02 03:04:05, with milliseconds only when there are any
+    return iso.slice(0, 19).replace('T', ' ') + (ms % 1000 ? iso.slice(19, 23) : '');
+}
+
+function scaleDecimal(digits, scale) {
+    if (!(scale > 0)) {
+        return digits;
+    }
+    const negative = digits.startsWith('-');
+    const padded = (negative ? digits.slice(1) : digits).padStart(scale + 1, '0');
+    return (negative ? '-' : '') + padded.slice(0, -scale) + '.' + padded.slice(-scale);
+}
+
+function formatFloat(value) {
+    if (Number.isNaN(value)) {
+        return 'NaN';
+    }
+    if (!Number.isFinite(value)) {
+        return value > 0 ? 'inf' : '-inf';
+    }
+    // Six decimals like pandas, switching to exponent form for extremes
+    const abs = Math.abs(value);
+    if (abs !== 0 && (abs < 1e-4 || abs >= 1e16)) {
+        return value.toExponential(6);
+    }
+    return String(Math.round(value * 1e6) / 1e6);
+}
+
 function focusNextCell(currentCellId) {
     const cellIds = cells.map(c => c.id);
     const currentIndex = cellIds.indexOf(currentCellId);